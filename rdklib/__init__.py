@@ -11,5 +11,32 @@ MY_VERSION = "0.3.10"
 from .configrule import ConfigRule, MissingTriggerHandlerError
 from .evaluator import Evaluator
 from .clientfactory import ClientFactory
-from .evaluation import ComplianceType, Evaluation
-from .errors import InvalidParametersError
+from .evaluation import ComplianceType, Evaluation, EvaluationBatch, PartialEvaluationList
+from .errors import InvalidParametersError, InvalidEvaluationError, PutEvaluationsError
+from .invocationcontext import InvocationContext
+from .profiling import ProfilingHook, CProfileHook
+from .crossaccount import CrossAccountEvaluator
+from .asyncconfigrule import AsyncConfigRule
+from .asyncevaluator import AsyncEvaluator
+from .asyncclientfactory import AsyncClientFactory
+
+__all__ = [
+    "AsyncClientFactory",
+    "AsyncConfigRule",
+    "AsyncEvaluator",
+    "CProfileHook",
+    "ClientFactory",
+    "ComplianceType",
+    "ConfigRule",
+    "CrossAccountEvaluator",
+    "Evaluation",
+    "EvaluationBatch",
+    "Evaluator",
+    "InvalidEvaluationError",
+    "InvalidParametersError",
+    "InvocationContext",
+    "MissingTriggerHandlerError",
+    "PartialEvaluationList",
+    "ProfilingHook",
+    "PutEvaluationsError",
+]
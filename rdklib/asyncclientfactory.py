@@ -0,0 +1,86 @@
+# Copyright 2017-2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the License is located at
+#
+#        http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
+# the specific language governing permissions and limitations under the License.
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of blocking boto3 calls run at the same time for the coroutines of an AsyncConfigRule, unless given max_workers.
+ASYNC_MAX_WORKERS = int(os.environ.get("RDKLIB_ASYNC_MAX_WORKERS", "32"))
+
+
+# Async counterpart of the ClientFactory given to the coroutines of an AsyncConfigRule. The clients it builds are the
+# cached boto3 clients of the wrapped ClientFactory, their blocking calls are run in a pool of max_workers threads.
+# The clients keep as many connections open as there are threads, so that concurrent calls do not wait for one.
+class AsyncClientFactory:
+    def __init__(self, client_factory, max_workers=None):
+        self.client_factory = client_factory
+        self.max_workers = max_workers or ASYNC_MAX_WORKERS
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    async def build_client(self, service, region=None, assume_role_mode=True):
+        client = await self.run(
+            self.client_factory.build_client, service, region, assume_role_mode, max_pool_connections=self.max_workers
+        )
+        return AsyncClient(client, self)
+
+    # Run a blocking function in the thread pool, e.g. code of the rule using a boto3 client directly.
+    async def run(self, function, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(function, *args, **kwargs)
+        )
+
+    # Await function(client, region) with a client of service for each region, all at the same time.
+    # Returns the results and the exceptions raised, in two dicts keyed by region.
+    async def map_regions(self, service, regions, function, assume_role_mode=True):
+        async def call(region):
+            return await function(await self.build_client(service, region, assume_role_mode), region)
+
+        regions = list(regions)
+        outcomes = await asyncio.gather(*[call(region) for region in regions], return_exceptions=True)
+        results = {}
+        errors = {}
+        for region, outcome in zip(regions, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Error in region {region}: {outcome}")
+                errors[region] = outcome
+            else:
+                results[region] = outcome
+        return results, errors
+
+    def close(self):
+        self.executor.shutdown()
+
+
+# Every method of the boto3 client becomes a coroutine, e.g. await client.describe_instances(). Other attributes,
+# like client.meta or client.exceptions, are those of the boto3 client.
+class AsyncClient:
+    def __init__(self, client, client_factory):
+        self.client = client
+        self.__client_factory = client_factory
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+
+        async def call(*args, **kwargs):
+            return await self.__client_factory.run(attribute, *args, **kwargs)
+
+        return call
+
+    # All the pages of a paginated operation, e.g. await client.paginate("describe_instances", Filters=[...]).
+    async def paginate(self, operation_name, **kwargs):
+        def get_pages():
+            return list(self.client.get_paginator(operation_name).paginate(**kwargs))
+
+        return await self.__client_factory.run(get_pages)
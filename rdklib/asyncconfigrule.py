@@ -0,0 +1,24 @@
+# Copyright 2017-2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the License is located at
+#
+#        http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
+# the specific language governing permissions and limitations under the License.
+
+from rdklib.configrule import ConfigRule, MissingTriggerHandlerError
+
+
+# ConfigRule whose evaluate_change() and evaluate_periodic() are coroutines, run by the AsyncEvaluator.
+# They are given an AsyncClientFactory instead of a ClientFactory. evaluate_parameters() can be a coroutine as well.
+class AsyncConfigRule(ConfigRule):
+    async def evaluate_change(self, event, client_factory, configuration_item, valid_rule_parameters):
+        raise MissingTriggerHandlerError("You must implement the evaluate_change method of the AsyncConfigRule class.")
+
+    async def evaluate_periodic(self, event, client_factory, valid_rule_parameters):
+        raise MissingTriggerHandlerError(
+            "You must implement the evaluate_periodic method of the AsyncConfigRule class."
+        )
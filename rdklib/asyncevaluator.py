@@ -0,0 +1,88 @@
+# Copyright 2017-2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the License is located at
+#
+#        http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
+# the specific language governing permissions and limitations under the License.
+
+import asyncio
+import inspect
+
+from rdklib.asyncclientfactory import AsyncClientFactory
+from rdklib.configrule import ConfigRule
+from rdklib.evaluator import Evaluator
+from rdklib.invocationcontext import is_overridden
+
+
+# Evaluator of an AsyncConfigRule. handle() is the same synchronous Lambda entry point as the one of the Evaluator,
+# each coroutine of the rule is run to completion in its own event loop.
+# max_workers bounds the number of blocking boto3 calls the coroutines of the rule run at the same time.
+# put_evaluations_max_workers is the number of batches of evaluations sent to AWS Config at the same time, as for the
+# Evaluator.
+class AsyncEvaluator(Evaluator):
+    def __init__(
+        self,
+        config_rule,
+        expected_resource_types=None,
+        is_applicable_status=False,
+        cache_rule_parameters=False,
+        profiling_hook=None,
+        max_workers=None,
+        coalesce_change_notifications=False,
+        put_evaluations_max_workers=None,
+    ):
+        super().__init__(
+            AsyncRuleRunner(config_rule, max_workers),
+            expected_resource_types,
+            is_applicable_status,
+            cache_rule_parameters,
+            profiling_hook,
+            coalesce_change_notifications,
+            put_evaluations_max_workers,
+        )
+
+
+# Synchronous ConfigRule running the coroutines of the async rule, for the Evaluator to call.
+class AsyncRuleRunner(ConfigRule):
+    def __init__(self, async_rule, max_workers=None):
+        self.adapted_rule = async_rule
+        self.max_workers = max_workers
+        self.delete_old_evaluations_on_scheduled_notification = (
+            async_rule.delete_old_evaluations_on_scheduled_notification
+        )
+        self.report_changed_evaluations_only = async_rule.report_changed_evaluations_only
+        self.changed_evaluations_refresh_seconds = async_rule.changed_evaluations_refresh_seconds
+
+        # Only the getters overridden by the async rule are forwarded, so that the defaults keep sharing the parsed event.
+        for method_name in ["get_execution_role_arn", "get_assume_role_region", "get_assume_role_mode"]:
+            if is_overridden(async_rule, method_name):
+                setattr(self, method_name, getattr(async_rule, method_name))
+
+    def evaluate_parameters(self, rule_parameters):
+        valid_rule_parameters = self.adapted_rule.evaluate_parameters(rule_parameters)
+        if inspect.isawaitable(valid_rule_parameters):
+            return asyncio.run(valid_rule_parameters)
+        return valid_rule_parameters
+
+    def evaluate_change(self, event, client_factory, configuration_item, valid_rule_parameters):
+        return asyncio.run(
+            self.__run(
+                self.adapted_rule.evaluate_change, event, client_factory, configuration_item, valid_rule_parameters
+            )
+        )
+
+    def evaluate_periodic(self, event, client_factory, valid_rule_parameters):
+        return asyncio.run(
+            self.__run(self.adapted_rule.evaluate_periodic, event, client_factory, valid_rule_parameters)
+        )
+
+    async def __run(self, evaluate, event, client_factory, *args):
+        async_client_factory = AsyncClientFactory(client_factory, self.max_workers)
+        try:
+            return await evaluate(event, async_client_factory, *args)
+        finally:
+            async_client_factory.close()
@@ -0,0 +1,152 @@
+# Copyright 2017-2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the License is located at
+#
+#        http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
+# the specific language governing permissions and limitations under the License.
+
+import base64
+import json
+from datetime import datetime, timezone
+
+from rdklib.clientfactory import ClientFactory
+from rdklib.errors import PutEvaluationsError
+from rdklib.util.evaluations import process_batch_evaluations
+
+
+# Holds what is shared by the Config events of a batch handled in a single invocation, see Evaluator.handle_batch().
+class BatchContext:
+    def __init__(self, collect_api_stats=False, put_evaluations_max_workers=None):
+        self.collect_api_stats = collect_api_stats
+        self.put_evaluations_max_workers = put_evaluations_max_workers
+        self.client_factories = {}
+        self.rule_parameters = {}
+        self.failures = []
+        self.__reports = {}
+
+    # Events with the same role, region and assume role mode share a ClientFactory, so its clients are built once.
+    def get_client_factory(self, invocation):
+        key = (invocation.execution_role_arn, invocation.assume_role_region, invocation.assume_role_mode)
+        if key not in self.client_factories:
+            self.client_factories[key] = ClientFactory(
+                role_arn=invocation.execution_role_arn,
+                region=invocation.assume_role_region,
+                assume_role_mode=invocation.assume_role_mode,
+                collect_api_stats=self.collect_api_stats,
+            )
+        return self.client_factories[key]
+
+    # The evaluations are reported by report(), together with those of the other events with the same result token.
+    def add_evaluations(self, identifier, event, client_factory, evaluations):
+        result_token = event["resultToken"]
+        if result_token not in self.__reports:
+            self.__reports[result_token] = (event, client_factory, [], [])
+        self.__reports[result_token][2].extend(evaluations)
+        self.__reports[result_token][3].append(identifier)
+        return evaluations
+
+    def add_failure(self, identifier):
+        self.failures.append(identifier)
+
+    # When reporting the evaluations of a result token fails, all the events they come from are failures.
+    # Evaluations AWS Config keeps rejecting would be rejected again, so their events are not retried.
+    def report(self):
+        for event, client_factory, evaluations, identifiers in self.__reports.values():
+            try:
+                process_batch_evaluations(event, client_factory, evaluations, self.put_evaluations_max_workers)
+            except PutEvaluationsError as ex:
+                print(f"Evaluations of records {identifiers} rejected by AWS Config: {ex}")
+            except Exception as ex:
+                print(f"Error while reporting the evaluations of records {identifiers}: {ex}")
+                self.failures.extend(identifiers)
+        self.__reports = {}
+
+    # Partial batch response of Lambda, for the event source mapping to retry only the records that failed.
+    def get_batch_response(self):
+        return {"batchItemFailures": [{"itemIdentifier": identifier} for identifier in self.failures]}
+
+
+# The (identifier, Config event) pairs of a batch. The batch is either a list of Config events, identified by their
+# index, or the event of an SQS or Kinesis event source mapping, whose records are identified as Lambda expects.
+# The Config event of a record is None when it cannot be decoded, for the record to be reported as a failure.
+def get_batch_events(batch):
+    if isinstance(batch, list):
+        return list(enumerate(batch))
+
+    batch_events = []
+    for record in batch["Records"]:
+        if record.get("eventSource") == "aws:sqs":
+            batch_events.append((record["messageId"], decode_record(record["body"])))
+        elif record.get("eventSource") == "aws:kinesis":
+            batch_events.append(
+                (record["kinesis"]["sequenceNumber"], decode_record(base64.b64decode(record["kinesis"]["data"])))
+            )
+        else:
+            print("Unexpected record in the batch: {}".format(record.get("eventSource")))
+            raise ValueError("Unexpected record in the batch: {}".format(record.get("eventSource")))
+    return batch_events
+
+
+def decode_record(data):
+    try:
+        return json.loads(data)
+    except ValueError as ex:
+        print(f"The record is not a JSON Config event: {ex}")
+        return None
+
+
+# Keep only the newest change notification of each resource of each rule, by configurationItemCaptureTime, so that a
+# burst of changes of a resource (e.g. during a CloudFormation stack update) is evaluated once.
+# Returns the (identifier, Config event) pairs to handle, and the identifiers of the records coalesced into newer ones.
+def coalesce_change_notifications(batch_events):
+    keys = [get_change_notification_key(event) for identifier, event in batch_events]
+    newest = {}
+    for index, (key, capture_time) in enumerate(keys):
+        if key and (key not in newest or capture_time >= newest[key][1]):
+            newest[key] = (index, capture_time)
+
+    coalesced_events = []
+    coalesced_identifiers = []
+    for index, (identifier, event) in enumerate(batch_events):
+        key = keys[index][0]
+        if key and newest[key][0] != index:
+            coalesced_identifiers.append(identifier)
+        else:
+            coalesced_events.append((identifier, event))
+    return coalesced_events, coalesced_identifiers
+
+
+# The rule, resource type and resource id of a change notification, and the time its configuration item was captured.
+# Other events, or notifications that cannot be parsed, are never coalesced and get a None key.
+def get_change_notification_key(event):
+    try:
+        invoking_event = json.loads(event["invokingEvent"])
+        if invoking_event["messageType"] == "ConfigurationItemChangeNotification":
+            configuration_item = invoking_event["configurationItem"]
+        elif invoking_event["messageType"] == "OversizedConfigurationItemChangeNotification":
+            configuration_item = invoking_event["configurationItemSummary"]
+        else:
+            return None, None
+        # A rule of an organization, or of an aggregator account, gets the notifications of resources of several accounts.
+        account_id = event.get("accountId") or configuration_item.get("awsAccountId")
+        key = (
+            event.get("configRuleName"),
+            account_id,
+            configuration_item["resourceType"],
+            configuration_item["resourceId"],
+        )
+        return key, parse_capture_time(configuration_item["configurationItemCaptureTime"])
+    except (KeyError, TypeError, ValueError):
+        return None, None
+
+
+# Capture times without a time zone are in UTC, like those of AWS Config.
+def parse_capture_time(capture_time):
+    parsed_time = datetime.fromisoformat(str(capture_time).replace("Z", "+00:00"))
+    if parsed_time.tzinfo is None:
+        return parsed_time.replace(tzinfo=timezone.utc)
+    return parsed_time
@@ -11,51 +11,266 @@
 
 import boto3
 import botocore
+import botocore.config
+import botocore.credentials
+import botocore.session
+import copy
+import datetime
 import os
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from rdklib.util import apistats, metrics
 
 CONFIG_ROLE_TIMEOUT_SECONDS = 900
 
+# Assumed role credentials are kept for the lifetime of the Lambda container and reused by later invocations.
+# They are botocore RefreshableCredentials, which assume the role again on their own, while the clients built with
+# them are being used, once they get within CREDENTIAL_REFRESH_MARGIN_SECONDS of their expiration. The calls wait for
+# the new credentials within CREDENTIAL_MANDATORY_REFRESH_SECONDS of it.
+# Set the RDKLIB_CREDENTIAL_CACHE environment variable to "false" to call sts:AssumeRole on every invocation.
+CREDENTIAL_CACHE_ENABLED = os.environ.get("RDKLIB_CREDENTIAL_CACHE", "true").lower() != "false"
+CREDENTIAL_REFRESH_MARGIN_SECONDS = int(os.environ.get("RDKLIB_CREDENTIAL_REFRESH_MARGIN_SECONDS", "300"))
+CREDENTIAL_MANDATORY_REFRESH_SECONDS = 60
+
+_credential_cache = {}
+_credential_locks = {}
+_credential_cache_lock = threading.Lock()
+
+# boto3 clients are reused per service, region and credentials instead of being built on every build_client call.
+# At most CLIENT_CACHE_MAX_SIZE clients are kept, the least recently used ones are dropped first.
+# Set the RDKLIB_CLIENT_CACHE environment variable to "false" to build a new client on every call.
+CLIENT_CACHE_ENABLED = os.environ.get("RDKLIB_CLIENT_CACHE", "true").lower() != "false"
+CLIENT_CACHE_MAX_SIZE = int(os.environ.get("RDKLIB_CLIENT_CACHE_MAX_SIZE", "100"))
+
+_client_cache = OrderedDict()
+# Reentrant, as refreshing credentials while a client is built builds the STS client.
+_client_cache_lock = threading.RLock()
+
+# The session of each assumed role credentials, see get_credentials_session().
+_credential_sessions = weakref.WeakKeyDictionary()
+
+# Number of regions map_regions() calls the function for at the same time, unless given max_workers.
+REGION_FANOUT_MAX_WORKERS = int(os.environ.get("RDKLIB_REGION_FANOUT_MAX_WORKERS", "10"))
+
+# A single long-lived session builds every client, whatever the credentials, so that the botocore data loader,
+# the loaded service models and the endpoint resolver are only set up once per Lambda container.
+_session = None
+_botocore_session = None
+_builtin_event_hooks = None
+_session_lock = threading.Lock()
+
 class ClientFactory:
     __sts_credentials = None
     __role_arn = None
     __region = None
     __assume_role_mode = None
+    api_call_stats = None
 
-    def __init__(self, role_arn, region=None, assume_role_mode=True):
+    # Set collect_api_stats to True to record the API calls made by the clients built from now on in api_call_stats,
+    # an ApiCallStats shared with the other ClientFactory objects collecting until apistats.stop_collection() is called.
+    def __init__(self, role_arn, region=None, assume_role_mode=True, collect_api_stats=False):
         self.__role_arn = role_arn
         self.__assume_role_mode = assume_role_mode
         if region == None:
             region = os.environ.get('AWS_REGION')
         self.__region = region
+        if collect_api_stats:
+            self.api_call_stats = apistats.get_current_stats() or apistats.start_collection()
 
-    def build_client(self, service, region=None, assume_role_mode=True):
+    # max_pool_connections is the number of connections the client keeps open, for clients used by more threads at the
+    # same time than the default of botocore (10).
+    def build_client(self, service, region=None, assume_role_mode=True, max_pool_connections=None):
+        client = self.__build_client(service, region, assume_role_mode, max_pool_connections)
+        if self.api_call_stats:
+            apistats.register_hooks(client)
+        return client
+
+    def __build_client(self, service, region, assume_role_mode, max_pool_connections):
         if not region:
             region = self.__region
 
         if not assume_role_mode or not self.__assume_role_mode:
-            return boto3.client(service, region)
+            return get_cached_client(service, region, max_pool_connections=max_pool_connections)
 
         if not self.__role_arn:
             raise Exception("No Role ARN - ClientFactory must be initialized with a role_arn or set assume_role_mode to False before build_client is called. You can also add assume_role_arn mode to false in build_client() if you want to use the current iam role")
         
         # Check to see if we have already gotten STS credentials for this role.  If not, get them now and then save them for later use.
         if not self.__sts_credentials:
-            self.__sts_credentials = get_assume_role_credentials(self.__role_arn, region)
+            self.__sts_credentials = get_cached_assume_role_credentials(self.__role_arn, region)
+
+        # Use the credentials to get a boto3 client for the appropriate service.
+        return get_cached_client(service, region, self.__sts_credentials, max_pool_connections=max_pool_connections)
+
+    # Call function(client, region) with a client of service for each region, concurrently through a pool of at most
+    # max_workers threads. Returns the results and the exceptions raised, in two dicts keyed by region, so that an
+    # error in one region does not prevent the others from being evaluated.
+    def map_regions(self, service, regions, function, max_workers=None, assume_role_mode=True):
+        def call(region):
+            return function(self.build_client(service, region, assume_role_mode), region)
+
+        results = {}
+        errors = {}
+        regions = list(regions)
+        if not regions:
+            return results, errors
+
+        with ThreadPoolExecutor(max_workers=min(max_workers or REGION_FANOUT_MAX_WORKERS, len(regions))) as executor:
+            futures = {region: executor.submit(call, region) for region in regions}
+            for region, future in futures.items():
+                ex = future.exception()
+                if ex:
+                    print(f"Error in region {region}: {ex}")
+                    errors[region] = ex
+                else:
+                    results[region] = future.result()
+        return results, errors
+
+    # Load the service models used by a rule ahead of time, e.g. at import time of the rule module,
+    # so that the first invocation does not pay for it.
+    @staticmethod
+    def warm_up(services):
+        get_session()
+        _botocore_session.get_component('endpoint_resolver')
+        for service in services:
+            _botocore_session.get_service_model(service)
+
+def get_session():
+    global _session, _botocore_session, _builtin_event_hooks
+    with _session_lock:
+        if _session is None:
+            _botocore_session = botocore.session.get_session()
+            _builtin_event_hooks = copy.copy(_botocore_session.get_component('event_emitter'))
+            _session = boto3.session.Session(botocore_session=_botocore_session)
+        return _session
+
+# Clients of assumed role credentials are built from a session of their own, which signs the requests with them.
+# It shares the data loader and the builtin event handlers of the shared session, so that it is cheap to build and the
+# service models are not loaded again.
+def get_credentials_session(credentials):
+    with _client_cache_lock:
+        session = _credential_sessions.get(credentials)
+        if session is None:
+            session = new_credentials_session(credentials)
+            _credential_sessions[credentials] = session
+        return session
+
+def new_credentials_session(credentials):
+    get_session()
+    botocore_session = botocore.session.Session(event_hooks=copy.copy(_builtin_event_hooks), include_builtin_handlers=False)
+    botocore_session.register_component('data_loader', _botocore_session.get_component('data_loader'))
+    botocore_session.register_component('credential_provider', botocore.credentials.CredentialResolver([AssumedRoleCredentialProvider(credentials)]))
+    return boto3.session.Session(botocore_session=botocore_session)
+
+class AssumedRoleCredentialProvider(botocore.credentials.CredentialProvider):
+    METHOD = 'rdklib-assume-role'
+
+    def __init__(self, credentials):
+        super().__init__()
+        self.credentials = credentials
+
+    def load(self):
+        return self.credentials
+
+# Clients are built under the lock, as the shared session is not thread-safe.
+def get_cached_client(service, region, credentials=None, endpoint_url=None, max_pool_connections=None):
+    if not CLIENT_CACHE_ENABLED:
+        with _client_cache_lock:
+            return new_client(service, region, credentials, endpoint_url, max_pool_connections)
+
+    key = (service, region, credentials, endpoint_url, max_pool_connections)
+    with _client_cache_lock:
+        client = _client_cache.get(key)
+        if client is not None:
+            _client_cache.move_to_end(key)
+            return client
+
+        client = new_client(service, region, credentials, endpoint_url, max_pool_connections)
+        _client_cache[key] = client
+        evict_cached_clients()
+        return client
+
+# Clients of expired credentials are dropped, as nothing used them since they expired (e.g. those of the accounts
+# already evaluated by a cross-account rule). Then the least recently used ones, beyond CLIENT_CACHE_MAX_SIZE.
+def evict_cached_clients():
+    for key in [key for key in _client_cache if is_expired(key[2])]:
+        del _client_cache[key]
+    while len(_client_cache) > CLIENT_CACHE_MAX_SIZE:
+        _client_cache.popitem(last=False)
+
+def new_client(service, region, credentials=None, endpoint_url=None, max_pool_connections=None):
+    config = None
+    if max_pool_connections:
+        config = botocore.config.Config(max_pool_connections=max_pool_connections)
+    if not credentials:
+        return get_session().client(service, region, endpoint_url=endpoint_url, config=config)
+    return get_credentials_session(credentials).client(service, region, endpoint_url=endpoint_url, config=config)
+
+def clear_client_cache():
+    with _client_cache_lock:
+        _client_cache.clear()
+
+def get_cached_assume_role_credentials(role_arn, region):
+    if not CREDENTIAL_CACHE_ENABLED:
+        return get_refreshable_credentials(role_arn, region)
+
+    key = (role_arn, region)
+    # One lock per role and region, so that concurrent callers share a single AssumeRole call without blocking each other.
+    with _credential_cache_lock:
+        key_lock = _credential_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        credentials = _credential_cache.get(key)
+        if credentials is None:
+            credentials = get_refreshable_credentials(role_arn, region)
+            with _credential_cache_lock:
+                _credential_cache[key] = credentials
+                evict_cached_credentials()
+        return credentials
+
+# Expired credentials are dropped, with their session, as nothing used them since they expired.
+def evict_cached_credentials():
+    for key in [key for key, credentials in _credential_cache.items() if is_expired(credentials)]:
+        del _credential_cache[key]
+
+def is_expired(credentials):
+    return credentials is not None and credentials.refresh_needed(0)
+
+def clear_credential_cache():
+    with _credential_cache_lock:
+        _credential_cache.clear()
+        _credential_locks.clear()
+
+# Assume the role, and again whenever the credentials need to be refreshed.
+def get_refreshable_credentials(role_arn, region):
+    def fetch_credentials():
+        return get_credentials_metadata(get_assume_role_credentials(role_arn, region))
+
+    return botocore.credentials.RefreshableCredentials.create_from_metadata(fetch_credentials(), fetch_credentials, 'assume-role', advisory_timeout=CREDENTIAL_REFRESH_MARGIN_SECONDS, mandatory_timeout=CREDENTIAL_MANDATORY_REFRESH_SECONDS)
 
-        # Use the credentials to get a new boto3 client for the appropriate service.
-        return boto3.client(service,
-                            aws_access_key_id=self.__sts_credentials['AccessKeyId'],
-                            aws_secret_access_key=self.__sts_credentials['SecretAccessKey'],
-                            aws_session_token=self.__sts_credentials['SessionToken'],
-                            region_name=region)
+# STS returns the expiration as a datetime, fall back on the requested duration if it is missing.
+def get_credentials_metadata(credentials):
+    expiration = credentials.get('Expiration')
+    if not hasattr(expiration, 'isoformat'):
+        expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=CONFIG_ROLE_TIMEOUT_SECONDS)
+    return {
+        'access_key': credentials['AccessKeyId'],
+        'secret_key': credentials['SecretAccessKey'],
+        'token': credentials['SessionToken'],
+        'expiry_time': expiration.isoformat(),
+    }
 
 def get_assume_role_credentials(role_arn, region):
     try:
-        try:
-            #use region specific url for sts client is recommended. In some cases, company firewall policies are blocking the global endpoint sts.amazonaws.com
-            assume_role_response = boto3.client('sts', region_name=region, endpoint_url="https://sts." + region + ".amazonaws.com").assume_role(RoleArn=role_arn,RoleSessionName="configLambdaExecution",DurationSeconds=CONFIG_ROLE_TIMEOUT_SECONDS)
-        except:
-            assume_role_response = boto3.client('sts').assume_role(RoleArn=role_arn,RoleSessionName="configLambdaExecution",DurationSeconds=CONFIG_ROLE_TIMEOUT_SECONDS)
+        metrics.count('AssumeRoleCalls')
+        with metrics.stage('AssumeRole'):
+            try:
+                #use region specific url for sts client is recommended. In some cases, company firewall policies are blocking the global endpoint sts.amazonaws.com
+                assume_role_response = get_cached_client('sts', region, endpoint_url="https://sts." + region + ".amazonaws.com").assume_role(RoleArn=role_arn,RoleSessionName="configLambdaExecution",DurationSeconds=CONFIG_ROLE_TIMEOUT_SECONDS)
+            except:
+                assume_role_response = get_cached_client('sts', None).assume_role(RoleArn=role_arn,RoleSessionName="configLambdaExecution",DurationSeconds=CONFIG_ROLE_TIMEOUT_SECONDS)
         return assume_role_response['Credentials']
     except botocore.exceptions.ClientError as ex:
         if 'AccessDenied' in ex.response['Error']['Code']:
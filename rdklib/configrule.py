@@ -14,6 +14,10 @@ import json
 class ConfigRule:
     #Set this to True to prevent removal of old evaluations when evaluate_compliance returns a list of compliance results.
     delete_old_evaluations_on_scheduled_notification = True
+    #Set this to True to only send the evaluations of a periodic rule whose compliance type or annotation changed since the last run.
+    report_changed_evaluations_only = False
+    #Unchanged evaluations are still sent when the result recorded by AWS Config is older than this, in seconds.
+    changed_evaluations_refresh_seconds = 86400
 
     def __init__(self):
         pass
@@ -28,35 +32,40 @@ class ConfigRule:
         raise MissingTriggerHandlerError("You must implement the evaluate_periodic method of the ConfigRule class.")
 
     def get_execution_role_arn(self, event):
-        role_arn = None
-        if 'ruleParameters' in event:
-            rule_params = json.loads(event['ruleParameters'])
-            role_name = rule_params.get("ExecutionRoleName")
-            if role_name:
-                execution_role_prefix = event["executionRoleArn"].split("/")[0]
-                role_arn = "{}/{}".format(execution_role_prefix, role_name)
-
-        if not role_arn:
-            role_arn = event['executionRoleArn']
-
-        return role_arn
+        return build_execution_role_arn(event, get_rule_parameters(event))
 
     def get_assume_role_region(self, event):
-        assume_role_region = None
-        if 'ruleParameters' in event:
-            rule_params = json.loads(event['ruleParameters'])
-            assume_role_region = rule_params.get("ExecutionRoleRegion")
-
-        return assume_role_region
+        return build_assume_role_region(get_rule_parameters(event))
     
     def get_assume_role_mode(self, event):
-        assume_role_mode = True
-        if 'ruleParameters' in event:
-            rule_params = json.loads(event['ruleParameters'])
-            if "AssumeRoleMode" in rule_params:
-                assume_role_mode = rule_params.get("AssumeRoleMode").lower() != "false"
+        return build_assume_role_mode(get_rule_parameters(event))
+
+def get_rule_parameters(event):
+    if 'ruleParameters' in event:
+        return json.loads(event['ruleParameters'])
+    return {}
+
+def build_execution_role_arn(event, rule_params):
+    role_arn = None
+    role_name = rule_params.get("ExecutionRoleName")
+    if role_name:
+        execution_role_prefix = event["executionRoleArn"].split("/")[0]
+        role_arn = "{}/{}".format(execution_role_prefix, role_name)
+
+    if not role_arn:
+        role_arn = event['executionRoleArn']
+
+    return role_arn
+
+def build_assume_role_region(rule_params):
+    return rule_params.get("ExecutionRoleRegion")
+
+def build_assume_role_mode(rule_params):
+    assume_role_mode = True
+    if "AssumeRoleMode" in rule_params:
+        assume_role_mode = rule_params.get("AssumeRoleMode").lower() != "false"
 
-        return assume_role_mode
+    return assume_role_mode
 
 class MissingTriggerHandlerError(Exception):
     pass
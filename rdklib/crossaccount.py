@@ -0,0 +1,95 @@
+# Copyright 2017-2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the License is located at
+#
+#        http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
+# the specific language governing permissions and limitations under the License.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from rdklib.clientfactory import ClientFactory
+from rdklib.evaluation import Evaluation, PartialEvaluationList
+
+# Number of accounts evaluated at the same time, unless given max_workers.
+CROSS_ACCOUNT_MAX_WORKERS = int(os.environ.get("RDKLIB_CROSS_ACCOUNT_MAX_WORKERS", "20"))
+
+ACCOUNT_RESOURCE_TYPE = "AWS::::Account"
+
+
+# Evaluate many member accounts of an organization from a single rule invocation. Each account gets its own
+# ClientFactory assuming role_name in that account, so the credentials are cached per account like those of the rule.
+# Accounts are evaluated concurrently, and an error in one account does not prevent the others from being evaluated.
+class CrossAccountEvaluator:
+    def __init__(self, role_name, region=None, partition="aws", max_workers=None):
+        self.role_name = role_name
+        self.region = region
+        self.partition = partition
+        self.max_workers = max_workers or CROSS_ACCOUNT_MAX_WORKERS
+        self.__client_factories = {}
+        self.__lock = threading.Lock()
+
+    # Same partition as an ARN of the invoking event, e.g. the executionRoleArn.
+    @classmethod
+    def from_event(cls, event, role_name, region=None, max_workers=None):
+        return cls(role_name, region, event["executionRoleArn"].split(":")[1], max_workers)
+
+    def get_role_arn(self, account_id):
+        return f"arn:{self.partition}:iam::{account_id}:role/{self.role_name}"
+
+    def get_client_factory(self, account_id):
+        with self.__lock:
+            if account_id not in self.__client_factories:
+                self.__client_factories[account_id] = ClientFactory(self.get_role_arn(account_id), self.region)
+            return self.__client_factories[account_id]
+
+    # Call evaluate(account_id, client_factory) for each account. It returns (or yields) the Evaluation objects of the
+    # account, which all get the account id as accountId. Those without a resource id are about the account itself and
+    # get the account as resource.
+    # Returns the evaluations and the exceptions raised, in two dicts keyed by account id.
+    def evaluate_accounts(self, account_ids, evaluate):
+        results = {}
+        errors = {}
+        account_ids = list(account_ids)
+        if not account_ids:
+            return results, errors
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(account_ids))) as executor:
+            futures = {
+                account_id: executor.submit(self.__evaluate_account, account_id, evaluate) for account_id in account_ids
+            }
+            for account_id, future in futures.items():
+                ex = future.exception()
+                if ex:
+                    print(f"Error while evaluating account {account_id}: {ex}")
+                    errors[account_id] = ex
+                else:
+                    results[account_id] = future.result()
+        return results, errors
+
+    def __evaluate_account(self, account_id, evaluate):
+        evaluations = []
+        for evaluation in evaluate(account_id, self.get_client_factory(account_id)):
+            if not isinstance(evaluation, Evaluation):
+                raise TypeError(f"The evaluations of account {account_id} are not Evaluation() objects.")
+            evaluation.accountId = account_id
+            if not evaluation.complianceResourceId:
+                evaluation.complianceResourceId = account_id
+                evaluation.complianceResourceType = ACCOUNT_RESOURCE_TYPE
+            evaluations.append(evaluation)
+        return evaluations
+
+
+# All the evaluations of the accounts, in the order of the accounts, e.g. to be returned by evaluate_periodic().
+# Given the errors of evaluate_accounts(), the evaluations are a PartialEvaluationList when some accounts failed, so
+# that the old evaluations of the resources of those accounts are not cleaned up as NOT_APPLICABLE.
+def get_all_evaluations(results, errors=None):
+    evaluations = [evaluation for evaluations in results.values() for evaluation in evaluations]
+    if errors:
+        return PartialEvaluationList(evaluations)
+    return evaluations
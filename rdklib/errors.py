@@ -10,4 +10,11 @@
 # the specific language governing permissions and limitations under the License.
 
 class InvalidParametersError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class InvalidEvaluationError(Exception):
+    pass
+
+# Raised when AWS Config keeps rejecting some evaluations of a put_evaluations call in FailedEvaluations.
+class PutEvaluationsError(Exception):
+    pass
@@ -10,31 +10,57 @@
 # the specific language governing permissions and limitations under the License.
 
 import json
+from rdklib.errors import InvalidEvaluationError
+
+INVALID_COMPLIANCE_TYPE_MESSAGE = 'The complianceType is not valid. Valid values include: ComplianceType.COMPLIANT, ComplianceType.COMPLIANT and ComplianceType.NOT_APPLICABLE'
 
 class ComplianceType:
     NOT_APPLICABLE = "NOT_APPLICABLE"
     COMPLIANT = "COMPLIANT"
     NON_COMPLIANT = "NON_COMPLIANT"
 
+    # Checked on every Evaluation construction, a frozenset makes it a constant time lookup.
+    VALUES = frozenset((NOT_APPLICABLE, COMPLIANT, NON_COMPLIANT))
+
     @staticmethod
     def get_valid_compliances():
         return [ComplianceType.NOT_APPLICABLE, ComplianceType.COMPLIANT, ComplianceType.NON_COMPLIANT]
 
+    @staticmethod
+    def is_valid(complianceType):
+        try:
+            return complianceType in ComplianceType.VALUES
+        except TypeError:
+            # Unhashable values are not valid compliance types either
+            return False
+
+# Rules can create a lot of evaluations, so they use slots instead of a per-instance __dict__ to save memory.
+# accountId is the account a CrossAccountEvaluator evaluated the resource in. It is not sent to AWS Config.
 class Evaluation:
-    annotation = ""
-    complianceResourceType = None
-    complianceType = None
-    complianceResourceId = None
-    orderingTimestamp = None
+    __slots__ = ("accountId", "annotation", "complianceResourceId", "complianceResourceType", "complianceType", "orderingTimestamp")
 
     def __init__(self, complianceType, resourceId=None, resourceType=None, annotation=""):
-        self.annotation = build_annotation(annotation)
+        if not ComplianceType.is_valid(complianceType):
+            raise InvalidEvaluationError(INVALID_COMPLIANCE_TYPE_MESSAGE)
+        self.annotation = build_annotation(annotation) if annotation else annotation
         self.complianceResourceId = resourceId
         self.complianceResourceType = resourceType
-        if not complianceType in ComplianceType.get_valid_compliances():
-            print('The complianceType is not valid. Valid values include: ComplianceType.COMPLIANT, ComplianceType.COMPLIANT and ComplianceType.NOT_APPLICABLE')
-            raise Exception('The complianceType is not valid. Valid values include: ComplianceType.COMPLIANT, ComplianceType.COMPLIANT and ComplianceType.NOT_APPLICABLE')
         self.complianceType = complianceType
+        self.orderingTimestamp = None
+        self.accountId = None
+
+    # Fast path for rules creating evaluations in bulk from values they already know to be valid:
+    # the compliance type is not checked, the annotation is still truncated if needed.
+    @classmethod
+    def from_trusted(cls, complianceType, resourceId, resourceType, annotation="", orderingTimestamp=None):
+        evaluation = cls.__new__(cls)
+        evaluation.annotation = build_annotation(annotation) if annotation else annotation
+        evaluation.complianceResourceId = resourceId
+        evaluation.complianceResourceType = resourceType
+        evaluation.complianceType = complianceType
+        evaluation.orderingTimestamp = orderingTimestamp
+        evaluation.accountId = None
+        return evaluation
 
     def __repr__(self):
         return f"Evaluation(annotation='{self.annotation}', resourceId='{self.complianceResourceId}', resourceType='{self.complianceResourceType}', complianceType='{self.complianceType}')"
@@ -52,7 +78,7 @@ class Evaluation:
 
     # This generate an evaluation for config
     def import_fields_from_periodic_event(self, event):
-        self.orderingTimestamp = str(json.loads(event['invokingEvent'])['notificationCreationTime'])
+        self.orderingTimestamp = get_periodic_ordering_timestamp(event)
 
     def import_fields_from_configuration_item(self, configuration_item):
         self.orderingTimestamp = configuration_item['configurationItemCaptureTime']
@@ -64,20 +90,16 @@ class Evaluation:
     # Check that an evaluation is well-formed
     def is_valid(self):
         if not self.complianceType:
-            print('Missing complianceType from an evaluation result.')
-            raise Exception('Missing complianceType from an evaluation result.')
+            raise InvalidEvaluationError('Missing complianceType from an evaluation result.')
 
         if not self.complianceResourceId:
-            print('Missing complianceResourceId from an evaluation result.')
-            raise Exception('Missing complianceResourceId from an evaluation result.')
+            raise InvalidEvaluationError('Missing complianceResourceId from an evaluation result.')
 
         if not self.complianceResourceType:
-            print('Missing complianceResourceType from an evaluation result.')
-            raise Exception('Missing complianceResourceType from an evaluation result.')
+            raise InvalidEvaluationError('Missing complianceResourceType from an evaluation result.')
 
         if not self.orderingTimestamp:
-            print('Missing orderingTimestamp from an evaluation result.')
-            raise Exception('Missing orderingTimestamp from an evaluation result.')
+            raise InvalidEvaluationError('Missing orderingTimestamp from an evaluation result.')
 
         return True
 
@@ -94,6 +116,76 @@ class Evaluation:
 
         return output
 
+# Evaluations returned by evaluate_periodic() when some resources could not be evaluated, e.g. because of an error in
+# one of the accounts or regions swept by the rule. The old evaluations of the resources missing from the list are then
+# kept, instead of being cleaned up as NOT_APPLICABLE.
+class PartialEvaluationList(list):
+    pass
+
+# Evaluations of many resources stored column by column, for rules producing a lot of them.
+# The columns are validated all at once and serialized straight into put_evaluations payloads,
+# instead of going through one Evaluation object per resource.
+class EvaluationBatch:
+    def __init__(self, complianceTypes=None, resourceIds=None, resourceTypes=None, annotations=None):
+        self.complianceTypes = list(complianceTypes or [])
+        self.complianceResourceIds = list(resourceIds or [])
+        self.complianceResourceTypes = list(resourceTypes or [])
+        self.annotations = list(annotations or [])
+        if not self.annotations:
+            self.annotations = [""] * len(self.complianceTypes)
+
+    def __len__(self):
+        return len(self.complianceTypes)
+
+    def __repr__(self):
+        return f"EvaluationBatch(size={len(self)})"
+
+    def add(self, complianceType, resourceId, resourceType, annotation=""):
+        self.complianceTypes.append(complianceType)
+        self.complianceResourceIds.append(resourceId)
+        self.complianceResourceTypes.append(resourceType)
+        self.annotations.append(annotation)
+
+    # Check that every evaluation of the batch is well-formed
+    def is_valid(self):
+        size = len(self.complianceTypes)
+        if not size == len(self.complianceResourceIds) == len(self.complianceResourceTypes) == len(self.annotations):
+            raise InvalidEvaluationError('The columns of the EvaluationBatch do not have the same length.')
+
+        if not is_valid_compliance_column(self.complianceTypes):
+            raise InvalidEvaluationError(INVALID_COMPLIANCE_TYPE_MESSAGE)
+
+        if not all(self.complianceResourceIds):
+            raise InvalidEvaluationError('Missing complianceResourceId from an evaluation result.')
+
+        if not all(self.complianceResourceTypes):
+            raise InvalidEvaluationError('Missing complianceResourceType from an evaluation result.')
+
+        return True
+
+    def iter_json(self, orderingTimestamp):
+        for complianceType, resourceId, resourceType, annotation in zip(self.complianceTypes, self.complianceResourceIds, self.complianceResourceTypes, self.annotations):
+            output = {
+                "ComplianceResourceId": resourceId,
+                "ComplianceResourceType": resourceType,
+                "ComplianceType": complianceType,
+                "OrderingTimestamp": orderingTimestamp
+            }
+
+            if annotation:
+                output["Annotation"] = build_annotation(annotation)
+
+            yield output
+
+def is_valid_compliance_column(complianceTypes):
+    try:
+        return ComplianceType.VALUES.issuperset(complianceTypes)
+    except TypeError:
+        return False
+
+def get_periodic_ordering_timestamp(event):
+    return str(json.loads(event['invokingEvent'])['notificationCreationTime'])
+
 # Build annotation within Service constraints
 def build_annotation(annotation_string):
     if len(annotation_string) > 256:
@@ -9,55 +9,153 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
 # the specific language governing permissions and limitations under the License.
 
+import copy
 import json
+import weakref
+from collections.abc import Iterator
+from contextlib import ExitStack, nullcontext
 import botocore
-from rdklib.util.evaluations import process_event_evaluations_list, process_periodic_evaluations_list
-from rdklib.util.service import build_parameters_value_error_response, build_internal_error_response, build_error_response, is_applicable_status, is_internal_error, check_defined, get_configuration_item, inflate_oversized_notification, is_applicable_resource_type
+from rdklib.util.evaluations import build_event_evaluations_list, process_event_evaluations_list, process_periodic_evaluations_list
+from rdklib.util.service import build_parameters_value_error_response, build_internal_error_response, build_error_response, is_applicable_status, is_error_response, is_internal_error, check_defined, get_configuration_item, inflate_oversized_notification, is_applicable_resource_type
 from rdklib.clientfactory import ClientFactory
+from rdklib.invocationcontext import InvocationContext
+from rdklib.batchcontext import BatchContext, coalesce_change_notifications, get_batch_events
 from rdklib.evaluation import ComplianceType, Evaluation
-from rdklib.errors import InvalidParametersError
+from rdklib.errors import InvalidParametersError, PutEvaluationsError
+from rdklib.profiling import get_default_profiling_hook
+from rdklib.util import apistats, metrics
+
+# Results of evaluate_parameters() per rule object and raw ruleParameters string, kept across warm invocations.
+_rule_parameters_cache = weakref.WeakKeyDictionary()
 
 class Evaluator:
     __rdk_rule = None
     __expected_resource_types = None
 
-    def __init__(self, config_rule, expected_resource_types=None, is_applicable_status=False):
+    # Set cache_rule_parameters to True to run evaluate_parameters() only once per distinct ruleParameters string.
+    # The validated parameters (or the InvalidParametersError raised) are then reused by all later invocations of the
+    # same rule object, so evaluate_parameters() must not depend on anything else than the rule parameters.
+    # profiling_hook is a ProfilingHook wrapped around evaluate_change() and evaluate_periodic(). It defaults to a
+    # CProfileHook when the RDKLIB_PROFILING environment variable is "true", and to no profiling otherwise.
+    # Set coalesce_change_notifications to True for handle_batch() to only evaluate the newest change notification of
+    # each resource in a batch. The records of the older ones succeed without being evaluated.
+    # put_evaluations_max_workers is the number of batches of evaluations sent to AWS Config at the same time. It defaults
+    # to the RDKLIB_PUT_EVALUATIONS_MAX_WORKERS environment variable.
+    def __init__(self, config_rule, expected_resource_types=None, is_applicable_status=False, cache_rule_parameters=False, profiling_hook=None, coalesce_change_notifications=False, put_evaluations_max_workers=None):
         self.__rdk_rule = config_rule
         self.is_applicable = is_applicable_status
+        self.cache_rule_parameters = cache_rule_parameters
+        self.coalesce_change_notifications = coalesce_change_notifications
+        self.put_evaluations_max_workers = put_evaluations_max_workers
+        self.profiling_hook = profiling_hook or get_default_profiling_hook()
         if expected_resource_types is None:
             self.__expected_resource_types = []
         else:
             self.__expected_resource_types = expected_resource_types
 
+    # With RDKLIB_METRICS set to "true", the duration of each stage is printed in Embedded Metric Format when done.
     def handle(self, event, context):
 
         check_defined(event, 'event')
 
-        client_factory = ClientFactory(role_arn=self.__rdk_rule.get_execution_role_arn(event), region=self.__rdk_rule.get_assume_role_region(event), assume_role_mode=self.__rdk_rule.get_assume_role_mode(event))
-        invoking_event = init_event(event, client_factory)
+        metrics.start_invocation(event.get('configRuleName') or type(self.__rdk_rule).__name__)
+        try:
+            with metrics.stage('Invocation'):
+                return self.__handle(event)
+        finally:
+            self.__end_invocation()
+
+    # Entry point for many Config events in a single invocation, e.g. change notifications routed through an SQS queue
+    # or a Kinesis stream. batch is a list of Config events, or the event of an SQS or Kinesis event source mapping.
+    # Events with the same role share a ClientFactory, events with the same rule parameters share the validated
+    # parameters, and the evaluations of change notifications are reported together per result token.
+    # Returns the records that failed, i.e. raised or got an error response, as a Lambda partial batch response.
+    def handle_batch(self, batch, context):
+
+        check_defined(batch, 'batch')
+
+        metrics.start_invocation(get_rule_class(self.__rdk_rule).__name__)
+        try:
+            with metrics.stage('Invocation'):
+                batch_context = BatchContext(collect_api_stats=apistats.API_CALL_STATS_ENABLED or metrics.METRICS_ENABLED, put_evaluations_max_workers=self.put_evaluations_max_workers)
+                batch_events = get_batch_events(batch)
+                record_count = len(batch_events)
+                if self.coalesce_change_notifications:
+                    batch_events, coalesced_identifiers = coalesce_change_notifications(batch_events)
+                    print(f"Coalesced {len(coalesced_identifiers)} change notifications into newer ones of the same resources.")
+                    metrics.count('CoalescedChangeNotifications', len(coalesced_identifiers))
+                for identifier, event in batch_events:
+                    self.__handle_batch_event(batch_context, identifier, event)
+                with metrics.stage('ReportEvaluations'):
+                    batch_context.report()
+            metrics.count('BatchRecords', record_count)
+            metrics.count('BatchRecordFailures', len(batch_context.failures))
+            return batch_context.get_batch_response()
+        finally:
+            self.__end_invocation()
+
+    def __handle_batch_event(self, batch_context, identifier, event):
+        try:
+            if event is None:
+                raise ValueError("The record is not a Config event.")
+            response = self.__handle(event, batch_context, identifier)
+        except Exception as ex:
+            print(f"Error while handling record {identifier}: {ex}")
+            response = None
+        if response is None or is_error_response(response):
+            batch_context.add_failure(identifier)
+
+    def __end_invocation(self):
+        api_call_stats = apistats.stop_collection()
+        if api_call_stats and metrics.get_current_metrics():
+            api_call_stats.add_to_metrics(metrics.get_current_metrics())
+        elif api_call_stats:
+            print(f"API call stats: {json.dumps(api_call_stats.get_summary())}")
+        metrics.end_invocation()
 
-        rule_parameters = {}
-        if 'ruleParameters' in event:
-            rule_parameters = json.loads(event['ruleParameters'])
+    # Events of a batch report the evaluations of change notifications through the BatchContext, once all are handled.
+    def __handle(self, event, batch_context=None, identifier=None):
+        with metrics.stage('ClientFactorySetup'):
+            invocation = InvocationContext(event, self.__rdk_rule)
+            if batch_context:
+                client_factory = batch_context.get_client_factory(invocation)
+            else:
+                client_factory = ClientFactory(role_arn=invocation.execution_role_arn, region=invocation.assume_role_region, assume_role_mode=invocation.assume_role_mode, collect_api_stats=apistats.API_CALL_STATS_ENABLED or metrics.METRICS_ENABLED)
+        invoking_event = init_event(event, client_factory, invocation.invoking_event)
+        invocation.invoking_event = invoking_event
 
         try:
-            valid_rule_parameters = self.__rdk_rule.evaluate_parameters(rule_parameters)
+            with metrics.stage('EvaluateParameters'):
+                valid_rule_parameters = self.__evaluate_parameters(event, invocation.rule_parameters, batch_context)
         except InvalidParametersError as ex:
             return build_parameters_value_error_response(ex)
 
         try:
             if invoking_event['messageType'] == 'ScheduledNotification':
-                compliance_result = self.__rdk_rule.evaluate_periodic(event, client_factory, valid_rule_parameters)
-                return process_periodic_evaluations_list(event, client_factory, compliance_result, self.__rdk_rule)
+                # Evaluations yielded from a generator are produced while being reported, within ReportEvaluations.
+                with ExitStack() as profiling:
+                    profiling.enter_context(self.__profile('evaluate_periodic'))
+                    with metrics.stage('EvaluatePeriodic'):
+                        compliance_result = self.__rdk_rule.evaluate_periodic(event, client_factory, valid_rule_parameters)
+                    stop_profiling_unless_iterator(profiling, compliance_result)
+                    with metrics.stage('ReportEvaluations'):
+                        return process_periodic_evaluations_list(event, client_factory, compliance_result, self.__rdk_rule, invocation.get_ordering_timestamp(), self.put_evaluations_max_workers)
             if invoking_event['messageType'] in ['ConfigurationItemChangeNotification', 'OversizedConfigurationItemChangeNotification']:
                 if not self.__expected_resource_types:
                     raise Exception("Change triggered rules must provide expected resource types")
                 configuration_item = get_configuration_item(invoking_event)
-                if is_applicable_status(configuration_item, event, is_applicable=self.is_applicable) and is_applicable_resource_type(configuration_item, self.__expected_resource_types):
-                    compliance_result = self.__rdk_rule.evaluate_change(event, client_factory, configuration_item, valid_rule_parameters)
-                else:
-                    compliance_result = [Evaluation(ComplianceType.NOT_APPLICABLE)]
-                return process_event_evaluations_list(event, client_factory, compliance_result, configuration_item)
+                with ExitStack() as profiling:
+                    if is_applicable_status(configuration_item, event, is_applicable=self.is_applicable) and is_applicable_resource_type(configuration_item, self.__expected_resource_types):
+                        profiling.enter_context(self.__profile('evaluate_change'))
+                        with metrics.stage('EvaluateChange'):
+                            compliance_result = self.__rdk_rule.evaluate_change(event, client_factory, configuration_item, valid_rule_parameters)
+                    else:
+                        compliance_result = [Evaluation(ComplianceType.NOT_APPLICABLE)]
+                    stop_profiling_unless_iterator(profiling, compliance_result)
+                    if batch_context:
+                        return batch_context.add_evaluations(identifier, event, client_factory, build_event_evaluations_list(compliance_result, configuration_item))
+                    with metrics.stage('ReportEvaluations'):
+                        return process_event_evaluations_list(event, client_factory, compliance_result, configuration_item, self.put_evaluations_max_workers)
             return build_internal_error_response('Unexpected message type', str(invoking_event))
         except botocore.exceptions.ClientError as ex:
             error_code = ex.response['Error']['Code']
@@ -71,12 +169,56 @@ class Evaluator:
             return build_error_response("Customer error while making API request", str(ex), ex.response['Error']['Code'], ex.response['Error']['Message'])
         except ValueError as ex:
             return build_internal_error_response(str(ex), str(ex))
+        except PutEvaluationsError as ex:
+            return build_internal_error_response("Unexpected error while reporting the evaluations", str(ex))
+
+    def __profile(self, name):
+        if not self.profiling_hook:
+            return nullcontext()
+        return self.profiling_hook.profile(name)
+
+    # The events of a batch share the validated parameters, even without cache_rule_parameters.
+    # Each invocation gets its own copy of them, so that the rule can modify it.
+    def __evaluate_parameters(self, event, rule_parameters, batch_context=None):
+        if self.cache_rule_parameters:
+            cache = _rule_parameters_cache.setdefault(getattr(self.__rdk_rule, 'adapted_rule', self.__rdk_rule), {})
+        elif batch_context:
+            cache = batch_context.rule_parameters
+        else:
+            return self.__rdk_rule.evaluate_parameters(rule_parameters)
+
+        key = event.get('ruleParameters')
+        if key not in cache:
+            try:
+                cache[key] = (self.__rdk_rule.evaluate_parameters(rule_parameters), None)
+            except InvalidParametersError as ex:
+                cache[key] = (None, ex)
+
+        valid_rule_parameters, error = cache[key]
+        if error:
+            raise error.with_traceback(None)
+        return copy.deepcopy(valid_rule_parameters)
+
+# The rule body of a generator only runs while its evaluations are consumed, i.e. reported, so it is profiled until then.
+def stop_profiling_unless_iterator(profiling, compliance_result):
+    if not isinstance(compliance_result, Iterator):
+        profiling.close()
+
+def clear_rule_parameters_cache():
+    _rule_parameters_cache.clear()
+
+# Rules run through an adapter, like the rules of the AsyncEvaluator, are identified by the class of the adapted rule.
+def get_rule_class(rule):
+    return type(getattr(rule, 'adapted_rule', rule))
 
-def init_event(event, client_factory):
-    invoking_event = json.loads(event['invokingEvent'])
+def init_event(event, client_factory, invoking_event=None):
+    if invoking_event is None:
+        invoking_event = json.loads(event['invokingEvent'])
     if not invoking_event['messageType'] == 'OversizedConfigurationItemChangeNotification':
         return invoking_event
 
-    config_client = client_factory.build_client('config')
-    change_notification = inflate_oversized_notification(config_client, invoking_event)
+    with metrics.stage('InflateOversizedConfigurationItem'):
+        config_client = client_factory.build_client('config')
+        change_notification = inflate_oversized_notification(config_client, invoking_event)
+    metrics.count('GetResourceConfigHistoryCalls')
     return change_notification
@@ -0,0 +1,62 @@
+# Copyright 2017-2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the License is located at
+#
+#        http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
+# the specific language governing permissions and limitations under the License.
+
+import json
+
+from rdklib.configrule import (
+    ConfigRule,
+    build_assume_role_mode,
+    build_assume_role_region,
+    build_execution_role_arn,
+    get_rule_parameters,
+)
+
+
+# Holds what is parsed out of a Config event, so that each invocation only parses it once.
+class InvocationContext:
+    event = None
+    invoking_event = None
+    rule_parameters = None
+    execution_role_arn = None
+    assume_role_region = None
+    assume_role_mode = None
+
+    def __init__(self, event, rule):
+        self.event = event
+        self.invoking_event = json.loads(event["invokingEvent"])
+        self.rule_parameters = get_rule_parameters(event)
+
+        # Rules overriding the ConfigRule getters keep being called with the raw event.
+        if is_overridden(rule, "get_execution_role_arn"):
+            self.execution_role_arn = rule.get_execution_role_arn(event)
+        else:
+            self.execution_role_arn = build_execution_role_arn(event, self.rule_parameters)
+
+        if is_overridden(rule, "get_assume_role_region"):
+            self.assume_role_region = rule.get_assume_role_region(event)
+        else:
+            self.assume_role_region = build_assume_role_region(self.rule_parameters)
+
+        if is_overridden(rule, "get_assume_role_mode"):
+            self.assume_role_mode = rule.get_assume_role_mode(event)
+        else:
+            self.assume_role_mode = build_assume_role_mode(self.rule_parameters)
+
+    # The ordering timestamp shared by all the evaluations of a periodic invocation, taken from the parsed invoking event.
+    def get_ordering_timestamp(self):
+        if "notificationCreationTime" not in self.invoking_event:
+            return None
+        return str(self.invoking_event["notificationCreationTime"])
+
+
+def is_overridden(rule, method_name):
+    method = getattr(rule, method_name)
+    return getattr(method, "__func__", None) is not getattr(ConfigRule, method_name)
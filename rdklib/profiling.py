@@ -0,0 +1,78 @@
+# Copyright 2017-2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the License is located at
+#
+#        http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
+# the specific language governing permissions and limitations under the License.
+
+import cProfile
+import io
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+# Set the RDKLIB_PROFILING environment variable to "true" to profile evaluate_change() and evaluate_periodic() with
+# cProfile in every Evaluator that is not given its own profiling hook.
+PROFILING_ENABLED = os.environ.get("RDKLIB_PROFILING", "false").lower() == "true"
+# Number of functions printed in the summary, sorted by cumulative time.
+PROFILING_TOP_N = int(os.environ.get("RDKLIB_PROFILING_TOP_N", "20"))
+# Directory to also write the full pstats file to, e.g. /tmp. Nothing is written when not set.
+PROFILING_OUTPUT_DIR = os.environ.get("RDKLIB_PROFILING_OUTPUT_DIR")
+
+
+# Base class of the profiling hooks given to the Evaluator. start() is called right before the rule method named
+# name is called, and stop() right after it returned or raised, or once its evaluations are reported when it is a
+# generator. Override both to plug in another profiler.
+class ProfilingHook:
+    def start(self, name):
+        pass
+
+    def stop(self, name):
+        pass
+
+    @contextmanager
+    def profile(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+
+# Profile the rule methods with cProfile, then print the top_n hotspots and optionally dump the stats to output_dir.
+class CProfileHook(ProfilingHook):
+    def __init__(self, top_n=None, output_dir=None):
+        self.top_n = top_n or PROFILING_TOP_N
+        self.output_dir = output_dir or PROFILING_OUTPUT_DIR
+        self.last_stats_file = None
+        self.__profiler = None
+
+    def start(self, name):
+        self.__profiler = cProfile.Profile()
+        self.__profiler.enable()
+
+    def stop(self, name):
+        self.__profiler.disable()
+        profiler = self.__profiler
+        self.__profiler = None
+
+        summary = io.StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+        print(f"Profile of {name}:\n{summary.getvalue()}")
+
+        if self.output_dir:
+            self.last_stats_file = os.path.join(self.output_dir, f"rdklib-{name}-{int(time.time() * 1000)}.pstats")
+            profiler.dump_stats(self.last_stats_file)
+            print(f"Profile of {name} written to {self.last_stats_file}")
+
+
+def get_default_profiling_hook():
+    if PROFILING_ENABLED:
+        return CProfileHook()
+    return None
@@ -0,0 +1,166 @@
+# Copyright 2017-2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the License is located at
+#
+#        http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
+# the specific language governing permissions and limitations under the License.
+
+import os
+import threading
+import time
+
+from rdklib.util.external import THROTTLING_ERROR_CODES
+
+# Set the RDKLIB_API_CALL_STATS environment variable to "true" to collect the API call stats of every invocation
+# handled by the Evaluator. They are also collected when RDKLIB_METRICS is "true", to be part of the metrics.
+API_CALL_STATS_ENABLED = os.environ.get("RDKLIB_API_CALL_STATS", "false").lower() == "true"
+
+# Upper bounds of the latency histogram buckets, in milliseconds. The last bucket counts the slower calls.
+LATENCY_BUCKETS_MILLISECONDS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Stats the botocore hooks record into. Clients are cached across invocations, so the hooks are registered once per
+# client and record into the stats of the invocation being handled, if any.
+_current = None
+
+
+class OperationStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttles = 0
+        self.total_milliseconds = 0.0
+        self.max_milliseconds = 0.0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MILLISECONDS) + 1)
+
+    def record_latency(self, milliseconds):
+        self.calls += 1
+        self.total_milliseconds += milliseconds
+        self.max_milliseconds = max(self.max_milliseconds, milliseconds)
+        bucket = 0
+        while bucket < len(LATENCY_BUCKETS_MILLISECONDS) and milliseconds > LATENCY_BUCKETS_MILLISECONDS[bucket]:
+            bucket += 1
+        self.latency_histogram[bucket] += 1
+
+    def get_summary(self):
+        return {
+            "Calls": self.calls,
+            "Errors": self.errors,
+            "Retries": self.retries,
+            "Throttles": self.throttles,
+            "TotalMilliseconds": round(self.total_milliseconds, 3),
+            "MaxMilliseconds": round(self.max_milliseconds, 3),
+            "LatencyHistogram": self.latency_histogram,
+        }
+
+
+# Number of calls, errors, retries, throttles and latency of the API calls made by the clients of a ClientFactory,
+# per "service.Operation". The latency of a call includes its retries.
+class ApiCallStats:
+    def __init__(self):
+        self.operations = {}
+        self.__lock = threading.Lock()
+
+    def get_operation_stats(self, operation):
+        with self.__lock:
+            return self.operations.setdefault(operation, OperationStats())
+
+    def record_call(self, operation, milliseconds, retries=0, error=False):
+        stats = self.get_operation_stats(operation)
+        with self.__lock:
+            stats.record_latency(milliseconds)
+            stats.retries += retries
+            if error:
+                stats.errors += 1
+
+    def record_throttle(self, operation):
+        stats = self.get_operation_stats(operation)
+        with self.__lock:
+            stats.throttles += 1
+
+    def get_summary(self):
+        with self.__lock:
+            return {operation: stats.get_summary() for operation, stats in self.operations.items()}
+
+    # The operations sorted by the time spent calling them, the slowest first.
+    def get_slowest_operations(self):
+        with self.__lock:
+            return sorted(
+                self.operations, key=lambda operation: self.operations[operation].total_milliseconds, reverse=True
+            )
+
+    # Add the calls, throttles and latency of each operation to the metrics of the invocation.
+    def add_to_metrics(self, metrics):
+        for operation, summary in self.get_summary().items():
+            metrics.add_count(f"{operation}.Calls", summary["Calls"])
+            metrics.add_count(f"{operation}.Throttles", summary["Throttles"])
+            metrics.add_duration(f"{operation}.Latency", summary["TotalMilliseconds"])
+        metrics.set_property("ApiCallStats", self.get_summary())
+
+
+def start_collection():
+    global _current
+    _current = ApiCallStats()
+    return _current
+
+
+def stop_collection():
+    global _current
+    stats = _current
+    _current = None
+    return stats
+
+
+def get_current_stats():
+    return _current
+
+
+# Register the hooks once per client, every client having its own copy of the botocore event handlers.
+# Clients without botocore events, e.g. test doubles, are not tracked.
+def register_hooks(client):
+    events = getattr(getattr(client, "meta", None), "events", None)
+    if events is None:
+        return
+    # Registered first so that handlers returning a response, e.g. botocore's Stubber, do not skip them.
+    events.register_first("before-call.*.*", before_call, unique_id="rdklib-apistats-before-call")
+    events.register("after-call.*.*", after_call, unique_id="rdklib-apistats-after-call")
+    events.register("after-call-error.*.*", after_call_error, unique_id="rdklib-apistats-after-call-error")
+    events.register("needs-retry.*.*", needs_retry, unique_id="rdklib-apistats-needs-retry")
+
+
+def get_operation_name(operation_model):
+    return f"{operation_model.service_model.service_name}.{operation_model.name}"
+
+
+def before_call(model, context, **kwargs):
+    if _current:
+        context["rdklib_call_start"] = time.perf_counter()
+
+
+def after_call(model, parsed, context, **kwargs):
+    start = context.pop("rdklib_call_start", None)
+    stats = _current
+    if not stats or start is None:
+        return
+    retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+    stats.record_call(get_operation_name(model), (time.perf_counter() - start) * 1000, retries, error="Error" in parsed)
+
+
+def after_call_error(model, context, **kwargs):
+    start = context.pop("rdklib_call_start", None)
+    stats = _current
+    if stats and start is not None:
+        stats.record_call(get_operation_name(model), (time.perf_counter() - start) * 1000, error=True)
+
+
+# Called after every attempt, with the parsed response of the attempt. Never asks for a retry by itself.
+def needs_retry(response=None, operation=None, **kwargs):
+    stats = _current
+    if not stats or not response or operation is None:
+        return
+    if response[1].get("Error", {}).get("Code") in THROTTLING_ERROR_CODES:
+        stats.record_throttle(get_operation_name(operation))
@@ -9,7 +9,17 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
 # the specific language governing permissions and limitations under the License.
 
-from rdklib.evaluation import ComplianceType, Evaluation
+import time
+from collections.abc import Iterator
+
+from rdklib.evaluation import (
+    ComplianceType,
+    Evaluation,
+    EvaluationBatch,
+    PartialEvaluationList,
+    get_periodic_ordering_timestamp,
+)
+from rdklib.util import metrics
 
 try:
     from rdklib.util.internal import process_evaluations
@@ -18,82 +28,262 @@ except ImportError as ex:
 
 
 # Build the evaluations list to return
-def process_event_evaluations_list(event, client_factory, compliance_result, configuration_item):
-    evaluations = []
+# evaluate_change() and evaluate_periodic() can return a list of Evaluation objects, or yield them from a generator.
+# Yielded evaluations are validated and sent to AWS Config in batches as they come, without keeping them all in memory.
+# evaluate_periodic() can also return an EvaluationBatch, which is validated and sent column by column.
+# max_workers is the number of batches of evaluations sent at the same time, see EvaluationSender.
+def process_event_evaluations_list(event, client_factory, compliance_result, configuration_item, max_workers=None):
+    check_event_compliance_result(compliance_result)
+    evaluations = stream_event_evaluations(compliance_result, configuration_item)
+    if isinstance(compliance_result, list):
+        evaluations = list(evaluations)
 
-    if not isinstance(compliance_result, list):
+    return process_evaluations(event, client_factory, evaluations, max_workers=max_workers)
+
+
+# The evaluations of a change notification handled in a batch, validated but not reported yet.
+def build_event_evaluations_list(compliance_result, configuration_item):
+    check_event_compliance_result(compliance_result)
+    return list(stream_event_evaluations(compliance_result, configuration_item))
+
+
+# Report the evaluations of all the change notifications of a batch sharing the result token of the event.
+def process_batch_evaluations(event, client_factory, evaluations, max_workers=None):
+    return process_evaluations(event, client_factory, evaluations, max_workers=max_workers)
+
+
+def check_event_compliance_result(compliance_result):
+    if not isinstance(compliance_result, (list, Iterator)):
         print("The return statement from evaluate_change() is not a list.")
         raise Exception("The return statement from evaluate_change() is not a list.")
 
+
+def stream_event_evaluations(compliance_result, configuration_item):
     for evaluation in compliance_result:
         if not isinstance(evaluation, Evaluation):
             print("The return statement from evaluate_change() is not a list of Evaluation() object.")
             raise Exception("The return statement from evaluate_change() is not a list of Evaluation() object.")
         evaluation.import_fields_from_configuration_item(configuration_item)
-        if evaluation.is_valid():
-            evaluations.append(evaluation.get_json())
+        evaluation.is_valid()
+        yield evaluation.get_json()
 
-    return process_evaluations(event, client_factory, evaluations)
 
-
-def process_periodic_evaluations_list(event, client_factory, compliance_result, rule):
+# All the evaluations of a periodic run share the same ordering timestamp, the notificationCreationTime of the invoking
+# event. It is parsed from the event at most once per run, or not at all when the caller provides it.
+def process_periodic_evaluations_list(
+    event, client_factory, compliance_result, rule, ordering_timestamp=None, max_workers=None
+):
     evaluations = []
     latest_evaluations = []
 
+    if isinstance(compliance_result, Iterator):
+        ordering_timestamp = ordering_timestamp or get_periodic_ordering_timestamp(event)
+        latest_evaluations = build_periodic_evaluations_json(event, compliance_result, ordering_timestamp)
+        return process_evaluations(
+            event,
+            client_factory,
+            stream_periodic_evaluations(event, client_factory, latest_evaluations, rule, ordering_timestamp),
+            max_workers=max_workers,
+        )
+
+    if isinstance(compliance_result, EvaluationBatch):
+        compliance_result.is_valid()
+        ordering_timestamp = ordering_timestamp or get_periodic_ordering_timestamp(event)
+        latest_evaluations = compliance_result.iter_json(ordering_timestamp)
+        return process_evaluations(
+            event,
+            client_factory,
+            stream_periodic_evaluations(event, client_factory, latest_evaluations, rule, ordering_timestamp),
+            max_workers=max_workers,
+        )
+
     if not isinstance(compliance_result, list):
         print("The return statement from evaluate_periodic() is not a list.")
         raise Exception("The return statement from evaluate_periodic() is not a list.")
 
+    # The timestamp is only parsed once there is an evaluation to report.
+    latest_evaluations = list(build_periodic_evaluations_json(event, compliance_result, ordering_timestamp))
+    if latest_evaluations:
+        ordering_timestamp = latest_evaluations[0]["OrderingTimestamp"]
+
+    clean_up = rule.delete_old_evaluations_on_scheduled_notification
+    if clean_up and isinstance(compliance_result, PartialEvaluationList):
+        print("Not cleaning up old evaluations, the evaluations of this run are partial.")
+        clean_up = False
+
+    if rule.report_changed_evaluations_only:
+        evaluations = list(
+            stream_changed_periodic_evaluations(
+                event, client_factory, latest_evaluations, rule, ordering_timestamp, clean_up
+            )
+        )
+    elif clean_up:
+        # A list stays a list, so that the evaluations sent are returned, the clean-up ones included.
+        latest_eval_keys = {get_evaluation_key(latest_eval) for latest_eval in latest_evaluations}
+        evaluations = latest_evaluations + get_old_evaluations_to_clean_up(
+            event, client_factory, latest_eval_keys, ordering_timestamp
+        )
+    else:
+        evaluations = latest_evaluations
+
+    return process_evaluations(event, client_factory, evaluations, max_workers=max_workers)
+
+
+# Only the resource keys of the yielded evaluations are kept, to find the old evaluations to clean up once they are all sent.
+def stream_periodic_evaluations(event, client_factory, latest_evaluations, rule, ordering_timestamp=None):
+    if rule.report_changed_evaluations_only:
+        yield from stream_changed_periodic_evaluations(
+            event, client_factory, latest_evaluations, rule, ordering_timestamp
+        )
+        return
+
+    # The old results are read before the first evaluation is sent, see get_old_evaluation_keys().
+    old_eval_keys = []
+    if rule.delete_old_evaluations_on_scheduled_notification:
+        old_eval_keys = get_old_evaluation_keys(event, client_factory)
+
+    latest_eval_keys = set()
+    for evaluation_json in latest_evaluations:
+        latest_eval_keys.add(get_evaluation_key(evaluation_json))
+        yield evaluation_json
+
+    yield from iter_clean_up_evaluations(event, old_eval_keys, latest_eval_keys, ordering_timestamp)
+
+
+# Only yield the evaluations whose compliance type or annotation changed since the results currently recorded by
+# AWS Config, or whose recorded result is older than rule.changed_evaluations_refresh_seconds.
+# The recorded results are read once and also used to clean up the resources that are not evaluated anymore, unless
+# clean_up is False. It defaults to rule.delete_old_evaluations_on_scheduled_notification.
+def stream_changed_periodic_evaluations(
+    event, client_factory, latest_evaluations, rule, ordering_timestamp=None, clean_up=None
+):
+    if clean_up is None:
+        clean_up = rule.delete_old_evaluations_on_scheduled_notification
+    config_client = client_factory.build_client("config")
+    old_results = {}
+    for old_evals in iter_old_evaluation_pages(event, config_client):
+        for old_eval in old_evals:
+            old_qualifier = old_eval["EvaluationResultIdentifier"]["EvaluationResultQualifier"]
+            old_results[(old_qualifier["ResourceType"], old_qualifier["ResourceId"])] = (
+                old_eval.get("ComplianceType"),
+                old_eval.get("Annotation") or None,
+                get_result_recorded_timestamp(old_eval),
+            )
+
+    refresh_before = time.time() - rule.changed_evaluations_refresh_seconds
+    latest_eval_keys = set()
+    skipped_count = 0
+    for evaluation_json in latest_evaluations:
+        key = get_evaluation_key(evaluation_json)
+        latest_eval_keys.add(key)
+        old_result = old_results.get(key)
+        if (
+            old_result
+            and old_result[0] == evaluation_json["ComplianceType"]
+            and old_result[1] == (evaluation_json.get("Annotation") or None)
+            and old_result[2] > refresh_before
+        ):
+            skipped_count += 1
+            continue
+        yield evaluation_json
+
+    print(f"Skipped {skipped_count} evaluations unchanged since the last run.")
+    metrics.count("EvaluationsSkipped", skipped_count)
+
+    if clean_up:
+        for resource_type, resource_id in old_results:
+            if (resource_type, resource_id) not in latest_eval_keys:
+                ordering_timestamp = ordering_timestamp or get_periodic_ordering_timestamp(event)
+                yield build_clean_up_evaluation_json(ordering_timestamp, resource_type, resource_id)
+
+
+# Results without a recorded time are considered too old to be skipped.
+def get_result_recorded_timestamp(old_eval):
+    recorded_time = old_eval.get("ResultRecordedTime")
+    if hasattr(recorded_time, "timestamp"):
+        return recorded_time.timestamp()
+    return 0
+
+
+def build_periodic_evaluations_json(event, compliance_result, ordering_timestamp=None):
     for evaluation in compliance_result:
         if not isinstance(evaluation, Evaluation):
             print("The return statement from evaluate_periodic() is not a list of Evaluation() object.")
             raise Exception("The return statement from evaluate_periodic() is not a list of Evaluation() object.")
-        evaluation.import_fields_from_periodic_event(event)
-        if evaluation.is_valid():
-            latest_evaluations.append(evaluation.get_json())
+        if ordering_timestamp is None:
+            ordering_timestamp = get_periodic_ordering_timestamp(event)
+        evaluation.orderingTimestamp = ordering_timestamp
+        evaluation.is_valid()
+        yield evaluation.get_json()
 
-    if rule.delete_old_evaluations_on_scheduled_notification:
-        evaluations = clean_up_old_evaluations(event, client_factory, latest_evaluations)
-    else:
-        evaluations = latest_evaluations
 
-    return process_evaluations(event, client_factory, evaluations)
+# This removes older evaluation (usually useful for periodic rule not reporting on AWS::::Account).
+def clean_up_old_evaluations(event, client_factory, latest_evaluations, ordering_timestamp=None):
+    latest_eval_keys = {get_evaluation_key(latest_eval) for latest_eval in latest_evaluations}
 
+    return (
+        get_old_evaluations_to_clean_up(event, client_factory, latest_eval_keys, ordering_timestamp)
+        + latest_evaluations
+    )
 
-# This removes older evaluation (usually useful for periodic rule not reporting on AWS::::Account).
-def clean_up_old_evaluations(event, client_factory, latest_evaluations):
+
+# Resources are identified by their type and id, the same id can be used by resources of different types.
+def get_evaluation_key(evaluation_json):
+    return (evaluation_json["ComplianceResourceType"], evaluation_json["ComplianceResourceId"])
+
+
+# Build NOT_APPLICABLE evaluations for the resources previously evaluated that are not in latest_eval_keys anymore.
+# latest_eval_keys is a set of (resource type, resource id), so that each lookup is done in constant time.
+def get_old_evaluations_to_clean_up(event, client_factory, latest_eval_keys, ordering_timestamp=None):
+    return list(iter_old_evaluations_to_clean_up(event, client_factory, latest_eval_keys, ordering_timestamp))
+
+
+# Same as get_old_evaluations_to_clean_up(), but yields the evaluations, so that they can be sent as they are built.
+def iter_old_evaluations_to_clean_up(event, client_factory, latest_eval_keys, ordering_timestamp=None):
+    old_eval_keys = get_old_evaluation_keys(event, client_factory)
+    yield from iter_clean_up_evaluations(event, old_eval_keys, latest_eval_keys, ordering_timestamp)
+
+
+# The (resource type, resource id) of the results recorded by AWS Config, read from every page before the first
+# evaluation is sent. The evaluations sent meanwhile would change the results being paginated, e.g. the NOT_APPLICABLE
+# ones remove results from the COMPLIANT and NON_COMPLIANT ones. Only the keys are kept, so the memory used stays small.
+def get_old_evaluation_keys(event, client_factory):
     config_client = client_factory.build_client("config")
-    latest_eval_ids = []
-    for latest_eval in latest_evaluations:
-        latest_eval_ids.append(latest_eval["ComplianceResourceId"])
+    old_eval_keys = []
+    for old_evals in iter_old_evaluation_pages(event, config_client):
+        for old_eval in old_evals:
+            old_qualifier = old_eval["EvaluationResultIdentifier"]["EvaluationResultQualifier"]
+            old_eval_keys.append((old_qualifier["ResourceType"], old_qualifier["ResourceId"]))
+    return old_eval_keys
+
+
+def iter_clean_up_evaluations(event, old_eval_keys, latest_eval_keys, ordering_timestamp=None):
+    for resource_type, resource_id in old_eval_keys:
+        if (resource_type, resource_id) not in latest_eval_keys:
+            ordering_timestamp = ordering_timestamp or get_periodic_ordering_timestamp(event)
+            yield build_clean_up_evaluation_json(ordering_timestamp, resource_type, resource_id)
+
 
-    cleaned_evaluations = []
+def build_clean_up_evaluation_json(ordering_timestamp, resource_type, resource_id):
+    metrics.count("EvaluationsCleanedUp")
+    return Evaluation.from_trusted(
+        ComplianceType.NOT_APPLICABLE, resource_id, resource_type, orderingTimestamp=ordering_timestamp
+    ).get_json()
 
-    old_evals = []
+
+def iter_old_evaluation_pages(event, config_client):
     next_token = ""
     while True:
-        compliance_details = config_client.get_compliance_details_by_config_rule(
-            ConfigRuleName=event["configRuleName"],
-            ComplianceTypes=["COMPLIANT", "NON_COMPLIANT"],
-            Limit=100,
-            NextToken=next_token,
-        )
+        metrics.count("GetComplianceDetailsByConfigRuleCalls")
+        with metrics.stage("CleanUpPagination"):
+            compliance_details = config_client.get_compliance_details_by_config_rule(
+                ConfigRuleName=event["configRuleName"],
+                ComplianceTypes=["COMPLIANT", "NON_COMPLIANT"],
+                Limit=100,
+                NextToken=next_token,
+            )
 
-        old_evals.extend(compliance_details["EvaluationResults"])
+        yield compliance_details["EvaluationResults"]
         next_token = compliance_details.get("NextToken", "")
         if not next_token:
             break
-
-    for old_eval in old_evals:
-        old_resource_id = old_eval["EvaluationResultIdentifier"]["EvaluationResultQualifier"]["ResourceId"]
-        if old_resource_id not in latest_eval_ids:
-            eval = Evaluation(
-                ComplianceType.NOT_APPLICABLE,
-                old_resource_id,
-                resourceType=old_eval["EvaluationResultIdentifier"]["EvaluationResultQualifier"]["ResourceType"],
-            )
-            eval.import_fields_from_periodic_event(event)
-
-            cleaned_evaluations.append(eval.get_json())
-
-    return cleaned_evaluations + latest_evaluations
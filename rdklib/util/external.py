@@ -1,4 +1,32 @@
-def process_evaluations(event, client_factory, evaluations):
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import botocore
+
+from rdklib.errors import PutEvaluationsError
+from rdklib.util import metrics
+
+PUT_EVALUATIONS_BATCH_SIZE = 100
+
+# Number of put_evaluations batches sent at the same time. The default of 1 sends the batches one after another.
+PUT_EVALUATIONS_MAX_WORKERS = int(os.environ.get("RDKLIB_PUT_EVALUATIONS_MAX_WORKERS", "1"))
+
+# Throttled calls and the FailedEvaluations of each response are retried with jittered exponential backoff.
+PUT_EVALUATIONS_MAX_ATTEMPTS = int(os.environ.get("RDKLIB_PUT_EVALUATIONS_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY_SECONDS = 0.2
+RETRY_MAX_DELAY_SECONDS = 5.0
+
+# The delay between two calls grows when put_evaluations gets throttled, and shrinks back on successful calls.
+THROTTLED_MIN_INTERVAL_SECONDS = 0.05
+THROTTLED_MAX_INTERVAL_SECONDS = 2.0
+
+THROTTLING_ERROR_CODES = ("Throttling", "ThrottlingException", "TooManyRequestsException", "RequestLimitExceeded")
+
+
+def process_evaluations(event, client_factory, evaluations, max_workers=None):
     config_client = client_factory.build_client('config')
 
     # Put together the request that reports the evaluation status
@@ -8,16 +36,148 @@ def process_evaluations(event, client_factory, evaluations):
         # Used solely for RDK test to skip actual put_evaluation API call
         test_mode = True
 
+    if not isinstance(evaluations, list):
+        return stream_evaluations(config_client, result_token, test_mode, evaluations, max_workers)
+
     if not evaluations:
         config_client.put_evaluations(Evaluations=[], ResultToken=result_token, TestMode=test_mode)
         return []
 
     # Invoke the Config API to report the result of the evaluation
-    evaluation_copy = []
-    evaluation_copy = evaluations[:]
-    while evaluation_copy:
-        config_client.put_evaluations(Evaluations=evaluation_copy[:100], ResultToken=result_token, TestMode=test_mode)
-        del evaluation_copy[:100]
+    sender = EvaluationSender(config_client, result_token, test_mode, max_workers)
+    for index in range(0, len(evaluations), PUT_EVALUATIONS_BATCH_SIZE):
+        sender.send(evaluations[index:index + PUT_EVALUATIONS_BATCH_SIZE])
+    sender.close()
 
     # Used solely for RDK test to be able to test Lambda function
     return evaluations
+
+
+# Send evaluations from an iterator as soon as a batch is full. They are not kept in memory, so nothing is returned.
+# Batches are sent in the background, so that producing the next evaluations (e.g. reading the next page of old
+# evaluations to clean up) overlaps with sending the previous ones.
+def stream_evaluations(config_client, result_token, test_mode, evaluations, max_workers=None):
+    sender = EvaluationSender(config_client, result_token, test_mode, max_workers, background=True)
+    batch = []
+    try:
+        for evaluation in evaluations:
+            batch.append(evaluation)
+            if len(batch) == PUT_EVALUATIONS_BATCH_SIZE:
+                sender.send(batch)
+                batch = []
+        if batch or not sender.batch_count:
+            sender.send(batch)
+    except Exception:
+        # The error raised while producing the evaluations is the one to report, not the ones of the batches.
+        sender.close(raise_errors=False)
+        raise
+    sender.close()
+    return []
+
+
+# Send batches of evaluations to put_evaluations, concurrently when max_workers is above 1,
+# and from a background thread when background is True.
+# Batches sent that way all get sent even if some fail, the failures are reported when closing the sender.
+class EvaluationSender:
+    def __init__(self, config_client, result_token, test_mode, max_workers=None, background=False):
+        self.config_client = config_client
+        self.result_token = result_token
+        self.test_mode = test_mode
+        self.max_workers = max_workers or PUT_EVALUATIONS_MAX_WORKERS
+        self.batch_count = 0
+        self.rate_limiter = AdaptiveRateLimiter()
+        self.__executor = None
+        self.__pending = []
+        self.__errors = []
+        if self.max_workers > 1 or background:
+            self.__executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def send(self, batch):
+        self.batch_count += 1
+        if not self.__executor:
+            self.__put_evaluations(batch)
+            return
+
+        # Bound the number of batches waiting to be sent, so that the memory used stays bounded as well.
+        while len(self.__pending) >= self.max_workers * 2:
+            self.__collect(*self.__pending.pop(0))
+        self.__pending.append((self.batch_count, self.__executor.submit(self.__put_evaluations, batch)))
+
+    def close(self, raise_errors=True):
+        if self.__executor:
+            for batch_number, future in self.__pending:
+                self.__collect(batch_number, future)
+            self.__pending = []
+            self.__executor.shutdown()
+
+        for batch_number, ex in self.__errors:
+            print(f"put_evaluations failed for batch {batch_number} of {self.batch_count}: {ex}")
+        if self.__errors and raise_errors:
+            raise self.__errors[0][1]
+
+    def __collect(self, batch_number, future):
+        ex = future.exception()
+        if ex:
+            self.__errors.append((batch_number, ex))
+
+    # Retry throttled calls, then only the entries AWS Config reports in FailedEvaluations.
+    # Entries still failing after the last attempt make the batch fail, like an error of the call.
+    def __put_evaluations(self, batch):
+        for attempt in range(PUT_EVALUATIONS_MAX_ATTEMPTS):
+            if attempt:
+                backoff(attempt)
+            self.rate_limiter.wait()
+            metrics.count('PutEvaluationsCalls')
+            try:
+                with metrics.stage('PutEvaluations'):
+                    response = self.config_client.put_evaluations(Evaluations=batch, ResultToken=self.result_token, TestMode=self.test_mode)
+            except botocore.exceptions.ClientError as ex:
+                if not is_throttling_error(ex) or attempt == PUT_EVALUATIONS_MAX_ATTEMPTS - 1:
+                    raise
+                self.rate_limiter.throttled()
+                continue
+
+            self.rate_limiter.succeeded()
+            failed_evaluations = list(response.get('FailedEvaluations') or [])
+            metrics.count('EvaluationsReported', len(batch) - len(failed_evaluations))
+            batch = failed_evaluations
+            if not batch:
+                return
+
+        metrics.count('EvaluationsFailed', len(batch))
+        print(f"put_evaluations failed for {len(batch)} evaluations after {PUT_EVALUATIONS_MAX_ATTEMPTS} attempts: {batch}")
+        raise PutEvaluationsError(f"put_evaluations failed for {len(batch)} evaluations after {PUT_EVALUATIONS_MAX_ATTEMPTS} attempts")
+
+
+# Space out the calls of all the threads of a sender, AIMD style: the interval doubles when throttled,
+# and decreases on every successful call until there is no delay anymore.
+class AdaptiveRateLimiter:
+    def __init__(self):
+        self.interval = 0.0
+        self.__next_call = 0.0
+        self.__lock = threading.Lock()
+
+    def wait(self):
+        with self.__lock:
+            now = time.monotonic()
+            delay = max(0.0, self.__next_call - now)
+            self.__next_call = max(now, self.__next_call) + self.interval
+        if delay:
+            time.sleep(delay)
+
+    def throttled(self):
+        with self.__lock:
+            self.interval = min(THROTTLED_MAX_INTERVAL_SECONDS, max(THROTTLED_MIN_INTERVAL_SECONDS, self.interval * 2))
+
+    def succeeded(self):
+        with self.__lock:
+            self.interval = max(0.0, self.interval - THROTTLED_MIN_INTERVAL_SECONDS / 2)
+
+
+def backoff(attempt):
+    # Full jitter, this is not used for any security purpose.
+    time.sleep(random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** attempt)))  # nosec B311
+
+
+def is_throttling_error(ex):
+    return ex.response['Error']['Code'] in THROTTLING_ERROR_CODES
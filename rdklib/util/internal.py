@@ -1,3 +1,8 @@
+from collections.abc import Iterator
+
+
 # Process evaluations
-def process_evaluations(event, client_factory, evaluations):
+def process_evaluations(event, client_factory, evaluations, max_workers=None):
+    if isinstance(evaluations, Iterator):
+        return list(evaluations)
     return evaluations
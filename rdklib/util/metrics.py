@@ -0,0 +1,114 @@
+# Copyright 2017-2022 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the License is located at
+#
+#        http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
+# the specific language governing permissions and limitations under the License.
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Set the RDKLIB_METRICS environment variable to "true" to print the duration of each stage of an invocation, the number
+# of API calls and the number of evaluations as one CloudWatch Embedded Metric Format (EMF) line at the end of
+# Evaluator.handle. CloudWatch Logs extracts the metrics from the Lambda function logs, nothing else is called.
+METRICS_ENABLED = os.environ.get("RDKLIB_METRICS", "false").lower() == "true"
+METRICS_NAMESPACE = os.environ.get("RDKLIB_METRICS_NAMESPACE", "rdklib")
+
+# Recorder of the invocation being handled, None when metrics are disabled or outside of Evaluator.handle.
+# Lambda runs one invocation at a time per container, the put_evaluations threads of the invocation share it.
+_current = None
+
+
+class InvocationMetrics:
+    def __init__(self, rule_name):
+        self.rule_name = rule_name
+        self.durations = {}
+        self.counts = {}
+        self.properties = {}
+        self.__lock = threading.Lock()
+
+    # Stages entered several times (e.g. one put_evaluations call per batch) add up.
+    def add_duration(self, stage, milliseconds):
+        with self.__lock:
+            self.durations[stage] = self.durations.get(stage, 0.0) + milliseconds
+
+    def add_count(self, name, value=1):
+        with self.__lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    # Properties are logged along with the metrics, without being metrics themselves.
+    def set_property(self, name, value):
+        with self.__lock:
+            self.properties[name] = value
+
+    def build_emf(self, namespace=None, timestamp=None):
+        with self.__lock:
+            durations = dict(self.durations)
+            counts = dict(self.counts)
+            properties = dict(self.properties)
+        metric_definitions = [{"Name": stage, "Unit": "Milliseconds"} for stage in durations]
+        metric_definitions += [{"Name": name, "Unit": "Count"} for name in counts]
+        emf = {
+            "_aws": {
+                "Timestamp": int(timestamp if timestamp is not None else time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": namespace or METRICS_NAMESPACE,
+                        "Dimensions": [["RuleName"]],
+                        "Metrics": metric_definitions,
+                    }
+                ],
+            },
+            "RuleName": self.rule_name,
+        }
+        emf.update({stage: round(duration, 3) for stage, duration in durations.items()})
+        emf.update(counts)
+        emf.update(properties)
+        return emf
+
+
+def start_invocation(rule_name):
+    global _current
+    _current = InvocationMetrics(rule_name) if METRICS_ENABLED else None
+    return _current
+
+
+def get_current_metrics():
+    return _current
+
+
+# Print the metrics of the current invocation, if any, and stop recording.
+def end_invocation():
+    global _current
+    metrics = _current
+    _current = None
+    if metrics:
+        print(json.dumps(metrics.build_emf()))
+    return metrics
+
+
+# Time the block as the given stage of the current invocation. Nothing is measured when metrics are disabled.
+@contextmanager
+def stage(name):
+    metrics = _current
+    if not metrics:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_duration(name, (time.perf_counter() - start) * 1000)
+
+
+def count(name, value=1):
+    metrics = _current
+    if metrics:
+        metrics.add_count(name, value)
@@ -77,6 +77,11 @@ def build_parameters_value_error_response(ex):
     )
 
 
+# Check whether the value returned when handling an event is one of the error responses above.
+def is_error_response(response):
+    return isinstance(response, dict) and "internalErrorMessage" in response
+
+
 # Check whether the message is OversizedConfigurationItemChangeNotification or not
 def is_oversized_changed_notification(message_type):
     check_defined(message_type, "messageType")
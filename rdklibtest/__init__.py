@@ -7,5 +7,6 @@
 #    or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the specific language governing permissions and limitations under the License.
 
 from .test import create_test_configurationchange_event, create_test_scheduled_event, assert_successful_evaluation, assert_customer_error_response
+from .fakeconfig import FakeConfigClient, FakeStsClient, use_fake_config
 
 MY_VERSION = "0.0.1"
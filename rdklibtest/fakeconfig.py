@@ -0,0 +1,263 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the License is located at
+#
+#        http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for
+# the specific language governing permissions and limitations under the License.
+
+import datetime
+import json
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import botocore
+from botocore.hooks import HierarchicalEmitter
+
+import rdklib.clientfactory
+
+PUT_EVALUATIONS_MAX_ITEMS = 100
+
+# The result token and rule name of the events built by create_test_configurationchange_event.
+TEST_EVENT_RESULT_TOKEN = "token"
+TEST_EVENT_CONFIG_RULE_NAME = "myrule"
+
+##############################
+# In-memory AWS Config fake  #
+##############################
+
+
+# Stand-in for the AWS Config client, keeping the evaluation results in memory so that a rule can be run repeatedly
+# and at high volume without AWS. The evaluations accepted by put_evaluations become the results returned by
+# get_compliance_details_by_config_rule on the next run, as in AWS Config. Evaluations are recorded for the rule
+# bound to their result token with bind_result_token(), the result token of the test events is bound to their rule.
+#
+# latency_seconds is slept on every call. throttle_rate is the probability of a call raising a ThrottlingException,
+# failure_rate the probability of an evaluation to be returned in FailedEvaluations instead of being recorded.
+# Give a seed to make the injected throttles and failures reproducible.
+# Set record_batches to True to keep the evaluations of each put_evaluations call in put_evaluations_batches. They are
+# not kept by default, so that high volume runs do not hold every evaluation in memory twice.
+class FakeConfigClient:
+    def __init__(self, latency_seconds=0, throttle_rate=0.0, failure_rate=0.0, seed=None, record_batches=False):
+        self.latency_seconds = latency_seconds
+        self.throttle_rate = throttle_rate
+        self.failure_rate = failure_rate
+        self.record_batches = record_batches
+        self.evaluation_results = {}
+        self.configuration_items = {}
+        self.calls = Counter()
+        self.throttled_calls = Counter()
+        self.put_evaluations_batches = []
+        self.result_token_rules = {TEST_EVENT_RESULT_TOKEN: TEST_EVENT_CONFIG_RULE_NAME}
+        self.meta = build_client_meta()
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+
+    def add_evaluation_result(
+        self, config_rule_name, resource_type, resource_id, compliance_type, annotation=None, recorded_time=None
+    ):
+        result = {
+            "EvaluationResultIdentifier": {
+                "EvaluationResultQualifier": {
+                    "ConfigRuleName": config_rule_name,
+                    "ResourceType": resource_type,
+                    "ResourceId": resource_id,
+                },
+            },
+            "ComplianceType": compliance_type,
+            "ResultRecordedTime": recorded_time or datetime.datetime.now(datetime.timezone.utc),
+        }
+        if annotation:
+            result["Annotation"] = annotation
+        with self.__lock:
+            self.evaluation_results.setdefault(config_rule_name, {})[(resource_type, resource_id)] = result
+
+    # configuration_item is shaped like the items returned by get_resource_config_history.
+    def add_configuration_item(self, configuration_item):
+        with self.__lock:
+            self.configuration_items[(configuration_item["resourceType"], configuration_item["resourceId"])] = (
+                configuration_item
+            )
+
+    def bind_result_token(self, result_token, config_rule_name):
+        with self.__lock:
+            self.result_token_rules[result_token] = config_rule_name
+
+    def get_evaluation_results(self, config_rule_name):
+        with self.__lock:
+            return list(self.evaluation_results.get(config_rule_name, {}).values())
+
+    def put_evaluations(self, ResultToken, Evaluations=None, TestMode=False):
+        self.__call("PutEvaluations")
+        evaluations = Evaluations or []
+        if len(evaluations) > PUT_EVALUATIONS_MAX_ITEMS:
+            raise build_client_error(
+                "PutEvaluations",
+                "ValidationException",
+                "1 validation error detected: Value at 'evaluations' failed to satisfy constraint: "
+                "Member must have length less than or equal to {}".format(PUT_EVALUATIONS_MAX_ITEMS),
+            )
+
+        failed_evaluations = []
+        with self.__lock:
+            if self.record_batches:
+                self.put_evaluations_batches.append(list(evaluations))
+            for evaluation in evaluations:
+                if self.failure_rate and self.__random.random() < self.failure_rate:
+                    failed_evaluations.append(evaluation)
+                elif not TestMode:
+                    self.__record(self.result_token_rules.get(ResultToken, ResultToken), evaluation)
+        return {"FailedEvaluations": failed_evaluations}
+
+    # The results are paginated from the results recorded when each page is read, by position, so the evaluations put
+    # while paginating (e.g. the clean up of the results already read) shift the next pages, as far as AWS Config
+    # gives no guarantee about it.
+    def get_compliance_details_by_config_rule(self, ConfigRuleName, ComplianceTypes=None, Limit=100, NextToken=""):
+        self.__call("GetComplianceDetailsByConfigRule")
+        start = int(NextToken or 0)
+        results = [
+            result
+            for result in self.get_evaluation_results(ConfigRuleName)
+            if not ComplianceTypes or result["ComplianceType"] in ComplianceTypes
+        ]
+
+        response = {"EvaluationResults": results[start : start + Limit]}
+        if start + Limit < len(results):
+            response["NextToken"] = str(start + Limit)
+        return response
+
+    def get_resource_config_history(self, resourceType, resourceId, limit=10, **kwargs):
+        self.__call("GetResourceConfigHistory")
+        with self.__lock:
+            configuration_item = self.configuration_items.get((resourceType, resourceId))
+        if not configuration_item:
+            raise build_client_error(
+                "GetResourceConfigHistory",
+                "ResourceNotDiscoveredException",
+                "Resource {} of resourceType:{} is unknown or has not been discovered".format(resourceId, resourceType),
+            )
+        return {"configurationItems": [configuration_item][:limit]}
+
+    def __call(self, operation):
+        with self.__lock:
+            self.calls[operation] += 1
+            throttled = self.throttle_rate and self.__random.random() < self.throttle_rate
+            if throttled:
+                self.throttled_calls[operation] += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if throttled:
+            raise build_client_error(operation, "ThrottlingException", "Rate exceeded")
+
+    def __record(self, config_rule_name, evaluation):
+        results = self.evaluation_results.setdefault(config_rule_name, {})
+        key = (evaluation["ComplianceResourceType"], evaluation["ComplianceResourceId"])
+        if evaluation["ComplianceType"] == "NOT_APPLICABLE":
+            results.pop(key, None)
+            return
+        result = {
+            "EvaluationResultIdentifier": {
+                "EvaluationResultQualifier": {
+                    "ConfigRuleName": config_rule_name,
+                    "ResourceType": key[0],
+                    "ResourceId": key[1],
+                },
+            },
+            "ComplianceType": evaluation["ComplianceType"],
+            "ResultRecordedTime": datetime.datetime.now(datetime.timezone.utc),
+        }
+        if evaluation.get("Annotation"):
+            result["Annotation"] = evaluation["Annotation"]
+        results[key] = result
+
+
+class FakeStsClient:
+    def __init__(self):
+        self.meta = build_client_meta()
+        self.calls = Counter()
+        self.role_arns = []
+        self.__lock = threading.Lock()
+
+    def assume_role(self, RoleArn, RoleSessionName, DurationSeconds=3600, **kwargs):
+        with self.__lock:
+            self.calls["AssumeRole"] += 1
+            self.role_arns.append(RoleArn)
+            call_number = self.calls["AssumeRole"]
+        return {
+            "Credentials": {
+                "AccessKeyId": "fake-access-key-id-{}".format(call_number),
+                "SecretAccessKey": "fake-secret-access-key",
+                "SessionToken": "fake-session-token",
+                "Expiration": datetime.datetime.now(datetime.timezone.utc)
+                + datetime.timedelta(seconds=DurationSeconds),
+            }
+        }
+
+
+# Like the meta of a boto3 client, for the botocore hooks registered on the clients (e.g. when collecting API call
+# stats) to be registered on the fakes as well. The fakes do not emit any event.
+def build_client_meta():
+    return SimpleNamespace(events=HierarchicalEmitter())
+
+
+# Session handing the fakes out to ClientFactory, whatever the region and the credentials.
+class FakeSession:
+    def __init__(self, config_client, sts_client=None, other_clients=None):
+        self.config_client = config_client
+        self.sts_client = sts_client or FakeStsClient()
+        self.other_clients = other_clients or {}
+
+    def client(self, service, *args, **kwargs):
+        if service == "config":
+            return self.config_client
+        if service == "sts":
+            return self.sts_client
+        return self.other_clients[service]
+
+
+# Make every ClientFactory build the fake clients while in the block, e.g. around Evaluator.handle().
+# other_clients maps service names to the clients to use for the other services the rule calls.
+@contextmanager
+def use_fake_config(config_client, sts_client=None, other_clients=None):
+    rdklib.clientfactory.clear_credential_cache()
+    rdklib.clientfactory.clear_client_cache()
+    try:
+        fake_session = FakeSession(config_client, sts_client, other_clients)
+        with patch.object(rdklib.clientfactory, "get_session", return_value=fake_session), patch.object(
+            rdklib.clientfactory, "get_credentials_session", return_value=fake_session
+        ):
+            yield config_client
+    finally:
+        rdklib.clientfactory.clear_credential_cache()
+        rdklib.clientfactory.clear_client_cache()
+
+
+# Build an item shaped like the ones of get_resource_config_history, to give to FakeConfigClient.add_configuration_item.
+def build_resource_config_history_item(resource_type, resource_id, configuration=None, relationships=None, tags=None):
+    return {
+        "version": "1.3",
+        "accountId": "123456789012",
+        "configurationItemCaptureTime": datetime.datetime.now(datetime.timezone.utc),
+        "configurationItemStatus": "OK",
+        "configurationStateId": "1",
+        "resourceType": resource_type,
+        "resourceId": resource_id,
+        "awsRegion": "us-east-1",
+        "tags": tags or {},
+        "relatedEvents": [],
+        "relationships": relationships or [],
+        "configuration": json.dumps(configuration or {}),
+        "supplementaryConfiguration": {},
+    }
+
+
+def build_client_error(operation, code, message):
+    return botocore.exceptions.ClientError({"Error": {"Code": code, "Message": message}}, operation)
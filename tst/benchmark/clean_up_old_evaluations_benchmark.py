@@ -0,0 +1,85 @@
+"""Benchmark clean_up_old_evaluations() against the number of evaluations.
+
+Run with `python tst/benchmark/clean_up_old_evaluations_benchmark.py`. The time per evaluation should stay roughly
+constant as the number of evaluations grows, i.e. the clean up scales linearly.
+"""
+
+import json
+import os
+import sys
+import time
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+from rdklib.evaluation import ComplianceType, Evaluation  # noqa: E402
+from rdklib.util.evaluations import clean_up_old_evaluations  # noqa: E402
+
+SIZES = [1000, 10000, 50000]
+EVENT = {
+    "invokingEvent": json.dumps({"notificationCreationTime": "2017-12-23T22:11:18.158Z"}),
+    "configRuleName": "some-rule-name",
+}
+
+
+class PagedConfigClient:
+    """Return the old evaluations 100 at a time, like get_compliance_details_by_config_rule."""
+
+    def __init__(self, evaluation_results):
+        self.evaluation_results = evaluation_results
+
+    def get_compliance_details_by_config_rule(self, ConfigRuleName, ComplianceTypes, Limit, NextToken):
+        start = int(NextToken or 0)
+        response = {"EvaluationResults": self.evaluation_results[start : start + Limit]}
+        if start + Limit < len(self.evaluation_results):
+            response["NextToken"] = str(start + Limit)
+        return response
+
+
+class ClientFactoryStub:
+    def __init__(self, config_client):
+        self.config_client = config_client
+
+    def build_client(self, service, *args, **kwargs):
+        return self.config_client
+
+
+def build_old_evaluation_result(resource_id):
+    return {
+        "EvaluationResultIdentifier": {
+            "EvaluationResultQualifier": {"ResourceId": resource_id, "ResourceType": "AWS::EC2::Instance"}
+        },
+        "ComplianceType": ComplianceType.COMPLIANT,
+    }
+
+
+def run(size):
+    # Half of the resources previously evaluated are not evaluated anymore and must be cleaned up
+    latest_evaluations = [
+        Evaluation(ComplianceType.COMPLIANT, "i-{}".format(i), "AWS::EC2::Instance").get_json() for i in range(size)
+    ]
+    old_results = [build_old_evaluation_result("i-{}".format(i)) for i in range(size // 2, size + size // 2)]
+    client_factory = ClientFactoryStub(PagedConfigClient(old_results))
+
+    start = time.perf_counter()
+    evaluations = clean_up_old_evaluations(EVENT, client_factory, latest_evaluations)
+    elapsed = time.perf_counter() - start
+    assert len(evaluations) == size + size // 2
+    return elapsed
+
+
+def main():
+    print("{:>10} {:>12} {:>16}".format("size", "total (ms)", "per eval (us)"))
+    for size in SIZES:
+        elapsed = run(size)
+        print("{:>10} {:>12.1f} {:>16.2f}".format(size, elapsed * 1000, elapsed * 1000000 / size))
+
+
+if __name__ == "__main__":
+    main()
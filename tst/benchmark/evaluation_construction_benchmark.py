@@ -0,0 +1,64 @@
+"""Benchmark the construction of Evaluation objects.
+
+Run with `python tst/benchmark/evaluation_construction_benchmark.py`. It builds one million evaluations with the
+validating constructor, with the Evaluation.from_trusted() fast path and with an EvaluationBatch.
+Like timeit, the garbage collector is disabled while timing, so that its collections do not hide the construction cost.
+"""
+
+import gc
+import os
+import sys
+import time
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+from rdklib.evaluation import ComplianceType, Evaluation, EvaluationBatch  # noqa: E402
+
+COUNT = 1000000
+RESOURCE_TYPE = "AWS::EC2::Instance"
+
+
+def build_with_constructor(resource_ids):
+    return [Evaluation(ComplianceType.COMPLIANT, resource_id, RESOURCE_TYPE) for resource_id in resource_ids]
+
+
+def build_with_from_trusted(resource_ids):
+    return [
+        Evaluation.from_trusted(ComplianceType.COMPLIANT, resource_id, RESOURCE_TYPE) for resource_id in resource_ids
+    ]
+
+
+def build_with_batch(resource_ids):
+    batch = EvaluationBatch()
+    for resource_id in resource_ids:
+        batch.add(ComplianceType.COMPLIANT, resource_id, RESOURCE_TYPE)
+    batch.is_valid()
+    return batch
+
+
+def main():
+    resource_ids = ["i-{:017x}".format(i) for i in range(COUNT)]
+    print("{} evaluations".format(COUNT))
+    for name, build in [
+        ("Evaluation()", build_with_constructor),
+        ("Evaluation.from_trusted()", build_with_from_trusted),
+        ("EvaluationBatch.add()", build_with_batch),
+    ]:
+        gc.disable()
+        start = time.perf_counter()
+        evaluations = build(resource_ids)
+        elapsed = time.perf_counter() - start
+        del evaluations
+        gc.enable()
+        print("{:>28} {:>10.1f} ms {:>8.0f} ns/evaluation".format(name, elapsed * 1000, elapsed * 1e9 / COUNT))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark the memory used per Evaluation object.
+
+Run with `python tst/benchmark/evaluation_memory_benchmark.py`. It compares Evaluation with an equivalent class keeping
+its attributes in a per-instance __dict__, the way Evaluation did before it used __slots__.
+"""
+
+import os
+import sys
+import tracemalloc
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+from rdklib.evaluation import ComplianceType, Evaluation, build_annotation  # noqa: E402
+
+COUNT = 100000
+
+
+class DictEvaluation:
+    """Same attributes as Evaluation, kept in a per-instance __dict__."""
+
+    def __init__(self, complianceType, resourceId=None, resourceType=None, annotation=""):
+        self.annotation = build_annotation(annotation)
+        self.complianceResourceId = resourceId
+        self.complianceResourceType = resourceType
+        self.complianceType = complianceType
+        self.orderingTimestamp = None
+
+
+def measure(evaluation_class):
+    # The resource ids are created before measuring, only the evaluation objects are accounted for
+    resource_ids = ["i-{:017x}".format(i) for i in range(COUNT)]
+    tracemalloc.start()
+    evaluations = [
+        evaluation_class(ComplianceType.COMPLIANT, resource_id, "AWS::EC2::Instance", "some-annotation")
+        for resource_id in resource_ids
+    ]
+    for evaluation in evaluations:
+        evaluation.orderingTimestamp = "2017-12-23T22:11:18.158Z"
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / COUNT
+
+
+def main():
+    before = measure(DictEvaluation)
+    after = measure(Evaluation)
+    print("bytes per evaluation, {} evaluations".format(COUNT))
+    print("{:>12} {:>10.1f}".format("__dict__", before))
+    print("{:>12} {:>10.1f}".format("__slots__", after))
+    print("{:>12} {:>9.0f}%".format("saved", 100 * (before - after) / before))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Benchmark Evaluator.handle end to end, offline.
+
+Run with `python tst/benchmark/evaluator_benchmark.py [size ...]`. The Config and STS clients are the in-memory fakes
+of rdklibtest.fakeconfig, so nothing is sent to AWS. Every scenario is run once to measure the wall time, then once
+more under tracemalloc to measure the peak memory, which includes the results kept by the fake.
+
+The evaluations are sent with rdklib.util.external.process_evaluations, which rdklib.util.evaluations replaces with a
+no-op when rdklib.util.internal is available.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from unittest.mock import patch
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+import rdklib.util.evaluations  # noqa: E402
+from rdklib import ComplianceType, ConfigRule, Evaluation, Evaluator  # noqa: E402
+from rdklib.util.external import process_evaluations  # noqa: E402
+from rdklibtest import create_test_configurationchange_event, create_test_scheduled_event  # noqa: E402
+from rdklibtest.fakeconfig import FakeConfigClient, build_resource_config_history_item, use_fake_config  # noqa: E402
+
+SIZES = [1000, 10000, 100000]
+OVERSIZED_INVOCATIONS = 100
+RESOURCE_TYPE = "AWS::EC2::Instance"
+
+
+class PeriodicListRule(ConfigRule):
+    def __init__(self, size):
+        self.size = size
+
+    def evaluate_periodic(self, event, client_factory, valid_rule_parameters):
+        client_factory.build_client("config")
+        return [Evaluation(ComplianceType.COMPLIANT, "i-{}".format(i), RESOURCE_TYPE) for i in range(self.size)]
+
+
+class PeriodicGeneratorRule(PeriodicListRule):
+    def evaluate_periodic(self, event, client_factory, valid_rule_parameters):
+        client_factory.build_client("config")
+        for i in range(self.size):
+            yield Evaluation(ComplianceType.COMPLIANT, "i-{}".format(i), RESOURCE_TYPE)
+
+
+class ChangeRule(ConfigRule):
+    def evaluate_change(self, event, client_factory, configuration_item, valid_rule_parameters):
+        return [Evaluation(ComplianceType.COMPLIANT)]
+
+
+def build_large_configuration_item(resource_id):
+    return build_resource_config_history_item(
+        RESOURCE_TYPE,
+        resource_id,
+        configuration={"blockDeviceMappings": [{"deviceName": "/dev/sd{}".format(i)} for i in range(2000)]},
+        relationships=[
+            {
+                "relationshipName": "Is associated with",
+                "resourceId": "sg-{}".format(i),
+                "resourceType": "AWS::EC2::SecurityGroup",
+            }
+            for i in range(500)
+        ],
+        tags={"tag-{}".format(i): "value" for i in range(50)},
+    )
+
+
+def build_oversized_event():
+    return create_test_configurationchange_event(
+        {
+            "messageType": "OversizedConfigurationItemChangeNotification",
+            "notificationCreationTime": "2017-12-23T22:11:18.158Z",
+            "recordVersion": "1.0",
+            "configurationItemSummary": {"resourceType": RESOURCE_TYPE, "resourceId": "i-oversized"},
+        }
+    )
+
+
+# Half of the resources evaluated by the previous run are not evaluated anymore and get cleaned up.
+def run_periodic(rule_class, size):
+    config_client = FakeConfigClient()
+    for i in range(size // 2, size + size // 2):
+        config_client.add_evaluation_result("myrule", RESOURCE_TYPE, "i-{}".format(i), "COMPLIANT")
+    evaluator = Evaluator(rule_class(size))
+    with use_fake_config(config_client):
+        evaluator.handle(create_test_scheduled_event(), {})
+    assert len(config_client.get_evaluation_results("myrule")) == size
+
+
+def run_oversized():
+    config_client = FakeConfigClient()
+    config_client.add_configuration_item(build_large_configuration_item("i-oversized"))
+    evaluator = Evaluator(ChangeRule(), [RESOURCE_TYPE])
+    with use_fake_config(config_client):
+        for _ in range(OVERSIZED_INVOCATIONS):
+            evaluator.handle(build_oversized_event(), {})
+
+
+def measure(scenario, *args):
+    start = time.perf_counter()
+    scenario(*args)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    scenario(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(sizes):
+    print("{:<36} {:>10} {:>12} {:>14}".format("scenario", "size", "wall (ms)", "peak mem (MB)"))
+    scenarios = []
+    for size in sizes:
+        scenarios.append(("periodic list + clean up", size, run_periodic, PeriodicListRule, size))
+        scenarios.append(("periodic generator + clean up", size, run_periodic, PeriodicGeneratorRule, size))
+    scenarios.append(("oversized configuration item", OVERSIZED_INVOCATIONS, run_oversized))
+
+    with patch.object(rdklib.util.evaluations, "process_evaluations", process_evaluations):
+        for name, size, scenario, *args in scenarios:
+            elapsed, peak = measure(scenario, *args)
+            print("{:<36} {:>10} {:>12.1f} {:>14.2f}".format(name, size, elapsed * 1000, peak / 1024 / 1024))
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
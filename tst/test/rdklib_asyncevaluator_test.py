@@ -0,0 +1,145 @@
+import asyncio
+import importlib
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+CODE = importlib.import_module("rdklib.asyncevaluator")
+
+import rdklib.util.evaluations
+import rdklib.util.external
+from rdklib import AsyncClientFactory, AsyncConfigRule, ComplianceType, Evaluation, MissingTriggerHandlerError
+from rdklib.evaluator import get_rule_class
+from rdklib.util.external import process_evaluations
+from rdklibtest import FakeConfigClient, create_test_scheduled_event, use_fake_config
+
+
+class AsyncPeriodicRule(AsyncConfigRule):
+    async def evaluate_parameters(self, rule_parameters):
+        return {"count": int(rule_parameters["count"])}
+
+    async def evaluate_periodic(self, event, client_factory, valid_rule_parameters):
+        results, errors = await client_factory.map_regions("ec2", ["us-east-1", "us-west-2"], self.count_instances)
+        return [
+            Evaluation(ComplianceType.COMPLIANT, "{}-{}".format(region, i), "AWS::EC2::Instance")
+            for region in sorted(results)
+            for i in range(results[region])
+        ]
+
+    async def count_instances(self, client, region):
+        pages = await client.paginate("describe_instances")
+        return len(pages)
+
+    def get_execution_role_arn(self, event):
+        return "arn:aws:iam::123456789012:role/other-role"
+
+
+class rdklibAsyncEvaluatorTest(unittest.TestCase):
+    @patch.object(rdklib.util.evaluations, "process_evaluations", process_evaluations)
+    def test_handle_periodic(self):
+        """The coroutines of the rule should be run by handle(), with async clients of the ClientFactory."""
+        ec2_client = MagicMock()
+        ec2_client.get_paginator.return_value.paginate.side_effect = lambda: iter([{}, {}])
+        config_client = FakeConfigClient()
+        with use_fake_config(config_client, other_clients={"ec2": ec2_client}):
+            evaluator = CODE.AsyncEvaluator(AsyncPeriodicRule())
+            evaluator.handle(create_test_scheduled_event({"count": "2"}), {})
+
+        self.assertEqual(
+            sorted(
+                result["EvaluationResultIdentifier"]["EvaluationResultQualifier"]["ResourceId"]
+                for result in config_client.get_evaluation_results("myrule")
+            ),
+            ["us-east-1-0", "us-east-1-1", "us-west-2-0", "us-west-2-1"],
+        )
+
+    @patch.object(rdklib.util.evaluations, "process_evaluations", process_evaluations)
+    def test_handle_put_evaluations_max_workers(self):
+        """The evaluations should be sent one batch after another, unless told otherwise."""
+        ec2_client = MagicMock()
+        ec2_client.get_paginator.return_value.paginate.side_effect = lambda: iter([{}])
+        for evaluator_kwargs, expected_max_workers in [
+            ({}, None),
+            ({"max_workers": 4}, None),
+            ({"max_workers": 4, "put_evaluations_max_workers": 2}, 2),
+        ]:
+            with self.subTest(evaluator_kwargs=evaluator_kwargs):
+                sender = MagicMock(wraps=rdklib.util.external.EvaluationSender)
+                with use_fake_config(FakeConfigClient(), other_clients={"ec2": ec2_client}):
+                    with patch.object(rdklib.util.external, "EvaluationSender", sender):
+                        evaluator = CODE.AsyncEvaluator(AsyncPeriodicRule(), **evaluator_kwargs)
+                        evaluator.handle(create_test_scheduled_event({"count": "1"}), {})
+                self.assertEqual(sender.call_args.args[3], expected_max_workers)
+
+    def test_rule_runner(self):
+        """Class attributes and overridden getters of the async rule should be forwarded, the others not."""
+        rule = AsyncPeriodicRule()
+        rule.report_changed_evaluations_only = True
+        runner = CODE.AsyncRuleRunner(rule)
+        self.assertIs(runner.adapted_rule, rule)
+        self.assertTrue(runner.report_changed_evaluations_only)
+        self.assertEqual(runner.get_execution_role_arn({}), "arn:aws:iam::123456789012:role/other-role")
+        self.assertNotIn("get_assume_role_region", vars(runner))
+        self.assertEqual(runner.evaluate_parameters({"count": "3"}), {"count": 3})
+        self.assertIs(get_rule_class(runner), AsyncPeriodicRule)
+
+    def test_missing_trigger_handler(self):
+        runner = CODE.AsyncRuleRunner(AsyncConfigRule())
+        with self.assertRaises(MissingTriggerHandlerError):
+            runner.evaluate_periodic({}, MagicMock(), {})
+        with self.assertRaises(MissingTriggerHandlerError):
+            runner.evaluate_change({}, MagicMock(), {}, {})
+
+
+class rdklibAsyncClientFactoryTest(unittest.TestCase):
+    def test_build_client(self):
+        """Methods of the boto3 client should become coroutines, other attributes should be left as they are."""
+        client_factory = MagicMock()
+        client_factory.build_client.return_value = MagicMock(meta="some-meta")
+        client_factory.build_client.return_value.describe_instances.return_value = {"Reservations": []}
+
+        async def run():
+            async_client_factory = AsyncClientFactory(client_factory, max_workers=2)
+            try:
+                client = await async_client_factory.build_client("ec2", "us-east-1")
+                self.assertEqual(client.meta, "some-meta")
+                return await client.describe_instances(MaxResults=5)
+            finally:
+                async_client_factory.close()
+
+        self.assertEqual(asyncio.run(run()), {"Reservations": []})
+        client_factory.build_client.assert_called_once_with("ec2", "us-east-1", True, max_pool_connections=2)
+        client_factory.build_client.return_value.describe_instances.assert_called_once_with(MaxResults=5)
+
+    def test_map_regions(self):
+        """Errors in a region should be kept apart from the results of the other regions."""
+
+        async def get_region(client, region):
+            if region == "eu-west-1":
+                raise ValueError("some-error")
+            return region
+
+        async def run():
+            async_client_factory = AsyncClientFactory(MagicMock())
+            try:
+                return await async_client_factory.map_regions("ec2", ["us-east-1", "eu-west-1"], get_region)
+            finally:
+                async_client_factory.close()
+
+        results, errors = asyncio.run(run())
+        self.assertEqual(results, {"us-east-1": "us-east-1"})
+        self.assertIsInstance(errors["eu-west-1"], ValueError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+import base64
+import importlib
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+CODE = importlib.import_module("rdklib.batchcontext")
+
+import rdklib.util.evaluations
+from rdklib import ComplianceType, ConfigRule, Evaluation, Evaluator, InvalidParametersError, PutEvaluationsError
+from rdklib.util.external import process_evaluations
+from rdklibtest import (
+    FakeConfigClient,
+    FakeStsClient,
+    create_test_configurationchange_event,
+    create_test_scheduled_event,
+    use_fake_config,
+)
+
+
+def build_change_event(
+    resource_id,
+    instance_type="t2.micro",
+    result_token="token",
+    rule_parameters=None,
+    capture_time="2017-12-23T22:11:18.158Z",
+    account_id="123456789012",
+):
+    event = create_test_configurationchange_event(
+        {
+            "messageType": "ConfigurationItemChangeNotification",
+            "notificationCreationTime": "2017-12-23T22:11:18.158Z",
+            "configurationItem": {
+                "resourceType": "AWS::EC2::Instance",
+                "resourceId": resource_id,
+                "configurationItemStatus": "OK",
+                "configurationItemCaptureTime": capture_time,
+                "configuration": {"instanceType": instance_type},
+            },
+        },
+        rule_parameters,
+    )
+    event["resultToken"] = result_token
+    event["accountId"] = account_id
+    return event
+
+
+class ChangeRule(ConfigRule):
+    parameters_evaluated = 0
+
+    def evaluate_parameters(self, rule_parameters):
+        self.parameters_evaluated += 1
+        if rule_parameters.get("invalid"):
+            raise InvalidParametersError("some-error")
+        return rule_parameters
+
+    def evaluate_change(self, event, client_factory, configuration_item, valid_rule_parameters):
+        client_factory.build_client("config")
+        if configuration_item["configuration"]["instanceType"] == "error":
+            raise ValueError("some-error")
+        if configuration_item["configuration"]["instanceType"] == "t2.micro":
+            return [Evaluation(ComplianceType.COMPLIANT)]
+        return [Evaluation(ComplianceType.NON_COMPLIANT)]
+
+
+class rdklibBatchContextTest(unittest.TestCase):
+    @patch.object(rdklib.util.evaluations, "process_evaluations", process_evaluations)
+    def test_handle_batch(self):
+        """Evaluations should be reported per result token, and failed records returned as partial failures."""
+        config_client = FakeConfigClient(record_batches=True)
+        sts_client = FakeStsClient()
+        config_client.bind_result_token("token-2", "myrule")
+        rule = ChangeRule()
+        batch = [
+            build_change_event("i-1"),
+            build_change_event("i-2", "m5.large"),
+            build_change_event("i-3", "error"),
+            build_change_event("i-4", result_token="token-2"),
+            build_change_event("i-5", rule_parameters={"invalid": "true"}),
+            {"invokingEvent": "{}"},
+        ]
+        with use_fake_config(config_client, sts_client):
+            response = Evaluator(rule, ["AWS::EC2::Instance"]).handle_batch(batch, {})
+
+        self.assertEqual(
+            response, {"batchItemFailures": [{"itemIdentifier": 2}, {"itemIdentifier": 4}, {"itemIdentifier": 5}]}
+        )
+        compliance_types = {
+            result["EvaluationResultIdentifier"]["EvaluationResultQualifier"]["ResourceId"]: result["ComplianceType"]
+            for result in config_client.get_evaluation_results("myrule")
+        }
+        self.assertEqual(compliance_types, {"i-1": "COMPLIANT", "i-2": "NON_COMPLIANT", "i-4": "COMPLIANT"})
+        self.assertEqual([len(batch) for batch in config_client.put_evaluations_batches], [2, 1])
+        self.assertEqual(rule.parameters_evaluated, 2)
+        self.assertEqual(len(sts_client.role_arns), 1)
+
+    @patch.object(rdklib.util.evaluations, "process_evaluations", process_evaluations)
+    def test_handle_batch_coalesce_change_notifications(self):
+        """Only the newest change notification of a resource should be evaluated, the older records succeed."""
+        config_client = FakeConfigClient(record_batches=True)
+        batch = [
+            build_change_event("i-1", "m5.large", capture_time="2017-12-23T22:11:20Z"),
+            build_change_event("i-1", "t2.micro", capture_time="2017-12-23T22:11:19.500Z"),
+            build_change_event("i-2", "error", capture_time="2017-12-23T22:11:18Z"),
+            build_change_event("i-2", "t2.micro", capture_time="2017-12-23T22:11:18.158Z"),
+        ]
+        with use_fake_config(config_client):
+            response = Evaluator(ChangeRule(), ["AWS::EC2::Instance"], coalesce_change_notifications=True).handle_batch(
+                batch, {}
+            )
+
+        self.assertEqual(response, {"batchItemFailures": []})
+        self.assertEqual(len(config_client.put_evaluations_batches), 1)
+        self.assertEqual(
+            [evaluation["ComplianceType"] for evaluation in config_client.put_evaluations_batches[0]],
+            ["NON_COMPLIANT", "COMPLIANT"],
+        )
+
+    def test_coalesce_change_notifications(self):
+        scheduled_event = create_test_scheduled_event()
+        batch_events = [
+            (0, build_change_event("i-1", capture_time="2017-12-23T22:11:18Z")),
+            (1, scheduled_event),
+            (2, None),
+            (3, build_change_event("i-1", capture_time="2017-12-23T22:11:18Z")),
+            (4, build_change_event("i-2", capture_time="2017-12-23T22:11:17Z")),
+        ]
+        coalesced_events, coalesced_identifiers = CODE.coalesce_change_notifications(batch_events)
+        self.assertEqual([identifier for identifier, event in coalesced_events], [1, 2, 3, 4])
+        self.assertEqual(coalesced_identifiers, [0])
+
+    def test_coalesce_change_notifications_accounts(self):
+        """Change notifications of resources with the same id in different accounts should not be coalesced."""
+        batch_events = [
+            (0, build_change_event("i-1", capture_time="2017-12-23T22:11:18Z", account_id="111111111111")),
+            (1, build_change_event("i-1", capture_time="2017-12-23T22:11:19Z", account_id="222222222222")),
+        ]
+        coalesced_events, coalesced_identifiers = CODE.coalesce_change_notifications(batch_events)
+        self.assertEqual([identifier for identifier, event in coalesced_events], [0, 1])
+        self.assertEqual(coalesced_identifiers, [])
+
+    def test_report_failure(self):
+        """All the records of a result token should fail when reporting its evaluations fails."""
+        batch_context = CODE.BatchContext()
+        with patch.object(CODE, "process_batch_evaluations", side_effect=ValueError("some-error")):
+            batch_context.add_evaluations("id-1", {"resultToken": "token"}, MagicMock(), [{}])
+            batch_context.add_evaluations("id-2", {"resultToken": "token"}, MagicMock(), [{}])
+            batch_context.report()
+        self.assertEqual(
+            batch_context.get_batch_response(),
+            {"batchItemFailures": [{"itemIdentifier": "id-1"}, {"itemIdentifier": "id-2"}]},
+        )
+
+    def test_report_rejected_evaluations(self):
+        """Records whose evaluations AWS Config keeps rejecting should not be retried."""
+        batch_context = CODE.BatchContext()
+        with patch.object(CODE, "process_batch_evaluations", side_effect=PutEvaluationsError("some-error")):
+            batch_context.add_evaluations("id-1", {"resultToken": "token"}, MagicMock(), [{}])
+            batch_context.report()
+        self.assertEqual(batch_context.get_batch_response(), {"batchItemFailures": []})
+
+    def test_get_batch_events(self):
+        event = build_change_event("i-1")
+        batch = {
+            "Records": [
+                {"eventSource": "aws:sqs", "messageId": "message-1", "body": json.dumps(event)},
+                {"eventSource": "aws:sqs", "messageId": "message-2", "body": "not-json"},
+                {
+                    "eventSource": "aws:kinesis",
+                    "kinesis": {"sequenceNumber": "49590338", "data": base64.b64encode(json.dumps(event).encode())},
+                },
+            ]
+        }
+        self.assertEqual(CODE.get_batch_events(batch), [("message-1", event), ("message-2", None), ("49590338", event)])
+        self.assertEqual(CODE.get_batch_events([event]), [(0, event)])
+        with self.assertRaises(Exception):
+            CODE.get_batch_events({"Records": [{"eventSource": "aws:sns"}]})
+
+
+if __name__ == "__main__":
+    unittest.main()
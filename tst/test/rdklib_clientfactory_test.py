@@ -1,6 +1,8 @@
+import datetime
 import importlib
 import os
 import sys
+import threading
 import unittest
 from unittest.mock import MagicMock, patch
 
@@ -19,6 +21,7 @@ CODE = importlib.import_module("rdklib.clientfactory")
 
 STS_CLIENT_MOCK = MagicMock()
 OTHER_CLIENT_MOCK = MagicMock()
+SESSION_MOCK = MagicMock()
 
 
 def client(client_name, *args, **kwargs):
@@ -27,12 +30,23 @@ def client(client_name, *args, **kwargs):
     return OTHER_CLIENT_MOCK
 
 
-def credentials(role_arn, region):
-    return {"AccessKeyId": "some-key-id", "SecretAccessKey": "some-secret", "SessionToken": "some-token"}
+def credentials(role_arn, region, expires_in=900, access_key_id="some-key-id"):
+    return {
+        "AccessKeyId": access_key_id,
+        "SecretAccessKey": "some-secret",
+        "SessionToken": "some-token",
+        "Expiration": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expires_in),
+    }
 
 
-@patch.object(CODE.boto3, "client", MagicMock(side_effect=client))
+@patch.object(SESSION_MOCK, "client", MagicMock(side_effect=client))
+@patch.object(CODE, "get_session", MagicMock(return_value=SESSION_MOCK))
+@patch.object(CODE, "get_credentials_session", MagicMock(return_value=SESSION_MOCK))
 class rdklibClientFactoryTest(unittest.TestCase):
+    def setUp(self):
+        CODE.clear_credential_cache()
+        CODE.clear_client_cache()
+
     @patch.object(CODE, "get_assume_role_credentials", MagicMock(side_effect=credentials))
     def test_clientfactory_build_client(self):
         # Init values
@@ -60,14 +74,12 @@ class rdklibClientFactoryTest(unittest.TestCase):
         self.assertEqual(response, OTHER_CLIENT_MOCK)
 
         # Creds already
-        other_creds = {
-            "AccessKeyId": "some-other-key-id",
-            "SecretAccessKey": "some-other-secret",
-            "SessionToken": "some-other-token",
-        }
+        other_creds = MagicMock()
         client_factory.__dict__["_ClientFactory__sts_credentials"] = other_creds
-        client_factory.build_client("other")
-        self.assertDictEqual(client_factory.__dict__["_ClientFactory__sts_credentials"], other_creds)
+        with patch.object(CODE, "get_credentials_session", MagicMock(return_value=SESSION_MOCK)) as get_session:
+            client_factory.build_client("other")
+        get_session.assert_called_once_with(other_creds)
+        self.assertIs(client_factory.__dict__["_ClientFactory__sts_credentials"], other_creds)
 
         # disable assume role mode
         client_factory = CODE.ClientFactory(
@@ -100,6 +112,19 @@ class rdklibClientFactoryTest(unittest.TestCase):
             context.exception.response, {"Error": {"Code": "InternalError", "Message": "InternalError"}}
         )
 
+    @patch.object(CODE, "CLIENT_CACHE_ENABLED", True)
+    def test_get_assume_role_credentials_reuses_sts_client(self):
+        """The regional STS client should be built once, through the client cache."""
+        session_client = MagicMock(side_effect=client)
+        STS_CLIENT_MOCK.assume_role.side_effect = None
+        STS_CLIENT_MOCK.assume_role.return_value = {"Credentials": "some-creds"}
+        with patch.object(SESSION_MOCK, "client", session_client):
+            CODE.get_assume_role_credentials("arn:aws:iam:::role/some-role-name", "some-region")
+            CODE.get_assume_role_credentials("arn:aws:iam:::role/some-other-role", "some-region")
+        session_client.assert_called_once_with(
+            "sts", "some-region", endpoint_url="https://sts.some-region.amazonaws.com", config=None
+        )
+
     def test_when_not_assume_role_mode_init(self):
         """ClientFactory should return the client assume role mode disabled."""
         client_factory = CODE.ClientFactory(
@@ -120,3 +145,198 @@ class rdklibClientFactoryTest(unittest.TestCase):
         response = client_factory.build_client("other", assume_role_mode=False)
         self.assertNotEqual(response, STS_CLIENT_MOCK)
         self.assertEqual(response, OTHER_CLIENT_MOCK)
+
+    @patch.object(CODE, "CREDENTIAL_CACHE_ENABLED", True)
+    def test_cached_assume_role_credentials_reused(self):
+        """Credentials should be reused across ClientFactory instances until they get close to expiring."""
+        get_credentials = MagicMock(side_effect=credentials)
+        with patch.object(CODE, "get_assume_role_credentials", get_credentials):
+            CODE.ClientFactory("arn:aws:iam:::role/some-role-name", "some-region").build_client("other")
+            CODE.ClientFactory("arn:aws:iam:::role/some-role-name", "some-region").build_client("other")
+            self.assertEqual(get_credentials.call_count, 1)
+
+            # A different role or region gets its own credentials
+            CODE.ClientFactory("arn:aws:iam:::role/some-other-role", "some-region").build_client("other")
+            CODE.ClientFactory("arn:aws:iam:::role/some-role-name", "some-other-region").build_client("other")
+            self.assertEqual(get_credentials.call_count, 3)
+
+    @patch.object(CODE, "CREDENTIAL_CACHE_ENABLED", True)
+    def test_cached_assume_role_credentials_refresh(self):
+        """Credentials within the refresh margin of their expiration should assume the role again when used."""
+        get_credentials = MagicMock(
+            side_effect=[
+                credentials(None, None, CODE.CREDENTIAL_REFRESH_MARGIN_SECONDS - 1),
+                credentials(None, None, access_key_id="some-other-key-id"),
+            ]
+        )
+        with patch.object(CODE, "get_assume_role_credentials", get_credentials):
+            cached = CODE.get_cached_assume_role_credentials("arn:aws:iam:::role/some-role-name", "some-region")
+            self.assertIs(
+                cached, CODE.get_cached_assume_role_credentials("arn:aws:iam:::role/some-role-name", "some-region")
+            )
+            self.assertEqual(get_credentials.call_count, 1)
+
+            self.assertEqual(cached.get_frozen_credentials().access_key, "some-other-key-id")
+            self.assertEqual(cached.get_frozen_credentials().access_key, "some-other-key-id")
+            self.assertEqual(get_credentials.call_count, 2)
+
+    @patch.object(CODE, "CREDENTIAL_CACHE_ENABLED", False)
+    def test_cached_assume_role_credentials_disabled(self):
+        """Every call should assume the role when the credential cache is disabled."""
+        get_credentials = MagicMock(side_effect=credentials)
+        with patch.object(CODE, "get_assume_role_credentials", get_credentials):
+            CODE.get_cached_assume_role_credentials("arn:aws:iam:::role/some-role-name", "some-region")
+            CODE.get_cached_assume_role_credentials("arn:aws:iam:::role/some-role-name", "some-region")
+            self.assertEqual(get_credentials.call_count, 2)
+
+    @patch.object(CODE, "CLIENT_CACHE_ENABLED", True)
+    @patch.object(CODE, "CREDENTIAL_CACHE_ENABLED", True)
+    @patch.object(CODE, "get_assume_role_credentials", MagicMock(side_effect=credentials))
+    def test_build_client_reuses_clients(self):
+        """Clients should be reused per service, region and credentials."""
+        new_client = MagicMock(side_effect=lambda *args, **kwargs: MagicMock())
+        with patch.object(CODE, "new_client", new_client):
+            client_factory = CODE.ClientFactory("arn:aws:iam:::role/some-role-name", "some-region")
+            client = client_factory.build_client("other")
+            self.assertIs(client, client_factory.build_client("other"))
+            self.assertIs(
+                client, CODE.ClientFactory("arn:aws:iam:::role/some-role-name", "some-region").build_client("other")
+            )
+            self.assertEqual(new_client.call_count, 1)
+
+            self.assertIsNot(client, client_factory.build_client("other", region="some-other-region"))
+            self.assertIsNot(client, client_factory.build_client("another"))
+            self.assertIsNot(client, client_factory.build_client("other", assume_role_mode=False))
+            self.assertEqual(new_client.call_count, 4)
+
+    @patch.object(CODE, "CLIENT_CACHE_ENABLED", True)
+    @patch.object(CODE, "CREDENTIAL_CACHE_ENABLED", True)
+    def test_build_client_reused_on_credential_refresh(self):
+        """Clients should be kept when their credentials get refreshed, as they sign with the refreshed ones."""
+        get_credentials = MagicMock(
+            side_effect=[
+                credentials(None, None, CODE.CREDENTIAL_REFRESH_MARGIN_SECONDS - 1),
+                credentials(None, None, access_key_id="some-other-key-id"),
+            ]
+        )
+        new_client = MagicMock(side_effect=lambda *args, **kwargs: MagicMock())
+        with patch.object(CODE, "get_assume_role_credentials", get_credentials), patch.object(
+            CODE, "new_client", new_client
+        ):
+            client = CODE.ClientFactory("arn:aws:iam:::role/some-role-name", "some-region").build_client("other")
+            self.assertIs(
+                client, CODE.ClientFactory("arn:aws:iam:::role/some-role-name", "some-region").build_client("other")
+            )
+            refreshed_credentials = new_client.call_args.args[2]
+            self.assertEqual(refreshed_credentials.get_frozen_credentials().access_key, "some-other-key-id")
+            self.assertEqual(new_client.call_count, 1)
+
+    @patch.object(CODE, "CLIENT_CACHE_ENABLED", True)
+    @patch.object(CODE, "CLIENT_CACHE_MAX_SIZE", 2)
+    def test_build_client_least_recently_used(self):
+        """The least recently used clients should be dropped beyond the maximum size of the cache."""
+        new_client = MagicMock(side_effect=lambda *args, **kwargs: MagicMock())
+        with patch.object(CODE, "new_client", new_client):
+            client_factory = CODE.ClientFactory("arn:aws:iam:::role/some-role-name", "some-region", False)
+            client = client_factory.build_client("some-service")
+            client_factory.build_client("some-other-service")
+            self.assertIs(client, client_factory.build_client("some-service"))
+            client_factory.build_client("another-service")
+            self.assertEqual([key[0] for key in CODE._client_cache], ["some-service", "another-service"])
+            self.assertEqual(new_client.call_count, 3)
+
+    @patch.object(CODE, "CLIENT_CACHE_ENABLED", True)
+    @patch.object(CODE, "CREDENTIAL_CACHE_ENABLED", True)
+    def test_build_client_expired_credentials_evicted(self):
+        """Clients and credentials that expired without being used should be dropped."""
+        get_credentials = MagicMock(side_effect=[credentials(None, None, 0), credentials(None, None)])
+        new_client = MagicMock(side_effect=lambda *args, **kwargs: MagicMock())
+        with patch.object(CODE, "get_assume_role_credentials", get_credentials), patch.object(
+            CODE, "new_client", new_client
+        ):
+            CODE.ClientFactory("arn:aws:iam::111111111111:role/some-role", "some-region").build_client("other")
+            CODE.ClientFactory("arn:aws:iam::222222222222:role/some-role", "some-region").build_client("other")
+        self.assertEqual(list(CODE._credential_cache), [("arn:aws:iam::222222222222:role/some-role", "some-region")])
+        self.assertEqual([key[2] for key in CODE._client_cache], list(CODE._credential_cache.values()))
+
+    @patch.object(CODE, "CLIENT_CACHE_ENABLED", False)
+    def test_build_client_cache_disabled(self):
+        """A new client should be built on every call when the client cache is disabled."""
+        new_client = MagicMock(side_effect=lambda *args, **kwargs: MagicMock())
+        with patch.object(CODE, "new_client", new_client):
+            client_factory = CODE.ClientFactory("arn:aws:iam:::role/some-role-name", "some-region", False)
+            self.assertIsNot(client_factory.build_client("other"), client_factory.build_client("other"))
+
+    @patch.object(CODE, "CLIENT_CACHE_ENABLED", True)
+    def test_map_regions(self):
+        """The function should run concurrently in every region, with the errors kept apart from the results."""
+        regions = ["us-east-1", "eu-west-1", "ap-south-1"]
+        barrier = threading.Barrier(len(regions), timeout=5)
+
+        def describe(client, region):
+            barrier.wait()
+            if region == "eu-west-1":
+                raise ValueError("some-error")
+            return (client, region)
+
+        client_factory = CODE.ClientFactory("arn:aws:iam:::role/some-role-name", "some-region", False)
+        results, errors = client_factory.map_regions("other", regions, describe)
+        self.assertEqual(
+            results, {"us-east-1": (OTHER_CLIENT_MOCK, "us-east-1"), "ap-south-1": (OTHER_CLIENT_MOCK, "ap-south-1")}
+        )
+        self.assertEqual(list(errors), ["eu-west-1"])
+        self.assertIsInstance(errors["eu-west-1"], ValueError)
+        self.assertEqual(sorted(key[1] for key in CODE._client_cache), sorted(regions))
+
+        self.assertEqual(client_factory.map_regions("other", [], describe), ({}, {}))
+
+    def test_build_client_collect_api_stats(self):
+        """The clients of a ClientFactory collecting API call stats should get the botocore hooks."""
+        client = MagicMock()
+        with patch.object(CODE, "new_client", MagicMock(return_value=client)):
+            self.assertIsNone(CODE.ClientFactory("some-role-arn", "some-region", False).api_call_stats)
+            client_factory = CODE.ClientFactory("some-role-arn", "some-region", False, collect_api_stats=True)
+            try:
+                self.assertIs(client_factory.api_call_stats, CODE.apistats.get_current_stats())
+                self.assertIs(client_factory.build_client("other"), client)
+                client.meta.events.register_first.assert_called_once()
+            finally:
+                CODE.apistats.stop_collection()
+
+    @patch.object(CODE, "_botocore_session", MagicMock())
+    def test_warm_up(self):
+        """warm_up() should load the service models on the shared session."""
+        CODE.ClientFactory.warm_up(["config", "ec2"])
+        CODE._botocore_session.get_service_model.assert_any_call("config")
+        CODE._botocore_session.get_service_model.assert_any_call("ec2")
+
+
+class rdklibClientFactorySessionTest(unittest.TestCase):
+    def test_get_session(self):
+        """get_session() should return the same session on every call."""
+        session = CODE.get_session()
+        self.assertIs(session, CODE.get_session())
+        self.assertIs(session._session, CODE._botocore_session)
+
+    def test_new_client_refreshable_credentials(self):
+        """Clients of assumed role credentials should sign their requests with the refreshable credentials."""
+        get_credentials = MagicMock(side_effect=credentials)
+        with patch.object(CODE, "get_assume_role_credentials", get_credentials):
+            refreshable_credentials = CODE.get_refreshable_credentials("arn:aws:iam:::role/some-role-name", "us-east-1")
+        client = CODE.new_client("config", "us-east-1", refreshable_credentials)
+        self.assertIs(client._request_signer._credentials, refreshable_credentials)
+        self.assertEqual(client.meta.region_name, "us-east-1")
+        self.assertIs(
+            CODE.get_credentials_session(refreshable_credentials),
+            CODE.get_credentials_session(refreshable_credentials),
+        )
+        self.assertIs(
+            CODE.get_credentials_session(refreshable_credentials)._session.get_component("data_loader"),
+            CODE._botocore_session.get_component("data_loader"),
+        )
+
+    def test_new_client_max_pool_connections(self):
+        """Clients shared by more threads than the botocore default should keep as many connections."""
+        self.assertEqual(CODE.new_client("config", "us-east-1").meta.config.max_pool_connections, 10)
+        client = CODE.new_client("config", "us-east-1", max_pool_connections=32)
+        self.assertEqual(client.meta.config.max_pool_connections, 32)
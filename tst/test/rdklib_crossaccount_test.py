@@ -0,0 +1,84 @@
+import importlib
+import os
+import sys
+import threading
+import unittest
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+CODE = importlib.import_module("rdklib.crossaccount")
+
+from rdklib.evaluation import ComplianceType, Evaluation, PartialEvaluationList
+from rdklibtest import FakeConfigClient, FakeStsClient, use_fake_config
+
+ACCOUNT_IDS = ["111111111111", "222222222222", "333333333333"]
+
+
+def evaluate_account(account_id, client_factory):
+    client_factory.build_client("config")
+    if account_id == "222222222222":
+        raise ValueError("some-error")
+    yield Evaluation(ComplianceType.COMPLIANT)
+    yield Evaluation(ComplianceType.NON_COMPLIANT, "some-bucket", "AWS::S3::Bucket")
+
+
+class rdklibCrossAccountTest(unittest.TestCase):
+    def test_evaluate_accounts(self):
+        """Each account should be evaluated with its own role, errors kept apart and credentials cached."""
+        sts_client = FakeStsClient()
+        cross_account = CODE.CrossAccountEvaluator("OrgConfigRole", "us-east-1")
+        with use_fake_config(FakeConfigClient(), sts_client):
+            results, errors = cross_account.evaluate_accounts(ACCOUNT_IDS, evaluate_account)
+            cross_account.evaluate_accounts(ACCOUNT_IDS, evaluate_account)
+
+        self.assertEqual(sorted(results), ["111111111111", "333333333333"])
+        self.assertEqual(list(errors), ["222222222222"])
+        self.assertIsInstance(errors["222222222222"], ValueError)
+        self.assertEqual(
+            [(e.complianceResourceId, e.complianceResourceType) for e in results["333333333333"]],
+            [("333333333333", "AWS::::Account"), ("some-bucket", "AWS::S3::Bucket")],
+        )
+        self.assertEqual([e.accountId for e in results["333333333333"]], ["333333333333", "333333333333"])
+        self.assertEqual(len(CODE.get_all_evaluations(results)), 4)
+        self.assertNotIsInstance(CODE.get_all_evaluations(results), PartialEvaluationList)
+        self.assertIsInstance(CODE.get_all_evaluations(results, errors), PartialEvaluationList)
+        self.assertEqual(len(CODE.get_all_evaluations(results, errors)), 4)
+        self.assertEqual(
+            sorted(sts_client.role_arns), ["arn:aws:iam::{}:role/OrgConfigRole".format(a) for a in ACCOUNT_IDS]
+        )
+
+    def test_evaluate_accounts_concurrently(self):
+        """Accounts should be evaluated at the same time, up to max_workers."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def evaluate(account_id, client_factory):
+            barrier.wait()
+            return [Evaluation(ComplianceType.COMPLIANT)]
+
+        cross_account = CODE.CrossAccountEvaluator("OrgConfigRole", max_workers=2)
+        results, errors = cross_account.evaluate_accounts(ACCOUNT_IDS[:2], evaluate)
+        self.assertEqual(sorted(results), ACCOUNT_IDS[:2])
+        self.assertFalse(errors)
+        self.assertEqual(cross_account.evaluate_accounts([], evaluate), ({}, {}))
+
+    def test_evaluate_accounts_invalid_evaluation(self):
+        cross_account = CODE.CrossAccountEvaluator("OrgConfigRole")
+        results, errors = cross_account.evaluate_accounts(["111111111111"], lambda account_id, cf: ["string"])
+        self.assertFalse(results)
+        self.assertIn("not Evaluation() objects", str(errors["111111111111"]))
+
+    def test_from_event(self):
+        cross_account = CODE.CrossAccountEvaluator.from_event(
+            {"executionRoleArn": "arn:aws-cn:iam::123456789012:role/some-role"}, "OrgConfigRole"
+        )
+        self.assertEqual(cross_account.get_role_arn("111111111111"), "arn:aws-cn:iam::111111111111:role/OrgConfigRole")
+        self.assertIs(
+            cross_account.get_client_factory("111111111111"), cross_account.get_client_factory("111111111111")
+        )
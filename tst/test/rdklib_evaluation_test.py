@@ -46,6 +46,14 @@ class rdklibEvaluationTest(unittest.TestCase):
             CODE.ComplianceType.SOMETHING_ELSE
         self.assertTrue("SOMETHING_ELSE" in str(context.exception))
 
+    def test_compliance_type_is_valid(self):
+        for compliance_type in CODE.ComplianceType.get_valid_compliances():
+            self.assertTrue(CODE.ComplianceType.is_valid(compliance_type))
+        self.assertEqual(CODE.ComplianceType.VALUES, frozenset(CODE.ComplianceType.get_valid_compliances()))
+        self.assertFalse(CODE.ComplianceType.is_valid("string"))
+        self.assertFalse(CODE.ComplianceType.is_valid(None))
+        self.assertFalse(CODE.ComplianceType.is_valid(["COMPLIANT"]))
+
     def test_evaluation_init(self):
         # Missing argument Error
         with self.assertRaises(TypeError) as context:
@@ -70,6 +78,11 @@ class rdklibEvaluationTest(unittest.TestCase):
             in str(context.exception)
         )
 
+        # Unhashable argument Error
+        with self.assertRaises(CODE.InvalidEvaluationError) as context:
+            evaluation = CODE.Evaluation(["COMPLIANT"])
+        self.assertTrue("The complianceType is not valid." in str(context.exception))
+
         # Default value
         evaluation = CODE.Evaluation(CODE.ComplianceType.COMPLIANT)
         self.assertEqual(evaluation.complianceType, CODE.ComplianceType.COMPLIANT)
@@ -202,3 +215,96 @@ class rdklibEvaluationTest(unittest.TestCase):
         # pylint: disable-next=eval-used
         actual = eval(str(evaluation))  # noqa: DUO104
         self.assertEqual(actual, evaluation)
+
+    def test_evaluation_slots(self):
+        """Evaluation should not have a per-instance __dict__, but subclasses can still add attributes."""
+        evaluation = CODE.Evaluation(CODE.ComplianceType.COMPLIANT, "some-resource-id", "some-resource-type")
+        self.assertFalse(hasattr(evaluation, "__dict__"))
+        with self.assertRaises(AttributeError):
+            evaluation.someAttribute = "some-value"
+
+        class SomeEvaluation(CODE.Evaluation):
+            pass
+
+        evaluation = SomeEvaluation(CODE.ComplianceType.COMPLIANT, "some-resource-id", "some-resource-type")
+        evaluation.someAttribute = "some-value"
+        self.assertEqual(evaluation.someAttribute, "some-value")
+
+    def test_evaluation_batch(self):
+        batch = CODE.EvaluationBatch()
+        batch.add(CODE.ComplianceType.COMPLIANT, "some-resource-id", "some-resource-type")
+        batch.add(CODE.ComplianceType.NON_COMPLIANT, "some-other-resource-id", "some-resource-type", "x" * 257)
+        self.assertEqual(len(batch), 2)
+        self.assertTrue(batch.is_valid())
+        response = list(batch.iter_json("some-date"))
+        resp_expected = [
+            {
+                "ComplianceResourceId": "some-resource-id",
+                "ComplianceResourceType": "some-resource-type",
+                "ComplianceType": "COMPLIANT",
+                "OrderingTimestamp": "some-date",
+            },
+            {
+                "ComplianceResourceId": "some-other-resource-id",
+                "ComplianceResourceType": "some-resource-type",
+                "ComplianceType": "NON_COMPLIANT",
+                "OrderingTimestamp": "some-date",
+                "Annotation": "x" * 244 + " [truncated]",
+            },
+        ]
+        self.assertEqual(response, resp_expected)
+
+        # Same as individual evaluations
+        evaluation = CODE.Evaluation(CODE.ComplianceType.COMPLIANT, "some-resource-id", "some-resource-type")
+        evaluation.orderingTimestamp = "some-date"
+        self.assertDictEqual(response[0], evaluation.get_json())
+
+    def test_evaluation_batch_columns(self):
+        batch = CODE.EvaluationBatch(
+            [CODE.ComplianceType.COMPLIANT] * 250,
+            ["some-resource-id-{}".format(i) for i in range(250)],
+            ["some-resource-type"] * 250,
+        )
+        self.assertTrue(batch.is_valid())
+        evaluations = list(batch.iter_json("some-date"))
+        self.assertEqual(len(evaluations), 250)
+        self.assertEqual(evaluations[-1]["ComplianceResourceId"], "some-resource-id-249")
+
+    def test_evaluation_batch_is_valid(self):
+        batch = CODE.EvaluationBatch([CODE.ComplianceType.COMPLIANT, "string"], ["id-1", "id-2"], ["type", "type"])
+        with self.assertRaises(Exception) as context:
+            batch.is_valid()
+        self.assertTrue("The complianceType is not valid." in str(context.exception))
+
+        batch = CODE.EvaluationBatch([CODE.ComplianceType.COMPLIANT] * 2, ["id-1", None], ["type", "type"])
+        with self.assertRaises(Exception) as context:
+            batch.is_valid()
+        self.assertTrue("Missing complianceResourceId from an evaluation result." in str(context.exception))
+
+        batch = CODE.EvaluationBatch([CODE.ComplianceType.COMPLIANT] * 2, ["id-1", "id-2"], ["type", ""])
+        with self.assertRaises(Exception) as context:
+            batch.is_valid()
+        self.assertTrue("Missing complianceResourceType from an evaluation result." in str(context.exception))
+
+        batch = CODE.EvaluationBatch([CODE.ComplianceType.COMPLIANT] * 2, ["id-1"], ["type", "type"])
+        with self.assertRaises(Exception) as context:
+            batch.is_valid()
+        self.assertTrue("The columns of the EvaluationBatch do not have the same length." in str(context.exception))
+
+    def test_evaluation_from_trusted(self):
+        evaluation = CODE.Evaluation.from_trusted(
+            CODE.ComplianceType.NON_COMPLIANT, "some-resource-id", "some-resource-type", "x" * 257, "some-date"
+        )
+        expected = CODE.Evaluation(
+            CODE.ComplianceType.NON_COMPLIANT, "some-resource-id", "some-resource-type", "x" * 257
+        )
+        expected.orderingTimestamp = "some-date"
+        self.assertEqual(evaluation, expected)
+        self.assertEqual(len(evaluation.annotation), 256)
+        self.assertTrue(evaluation.is_valid())
+
+        evaluation = CODE.Evaluation.from_trusted(
+            CODE.ComplianceType.COMPLIANT, "some-resource-id", "some-resource-type"
+        )
+        self.assertEqual(evaluation.annotation, "")
+        self.assertIsNone(evaluation.orderingTimestamp)
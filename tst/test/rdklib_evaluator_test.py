@@ -2,7 +2,9 @@ import json
 import unittest
 from unittest.mock import patch, MagicMock
 import botocore
-from rdklib.errors import InvalidParametersError
+from rdklib.configrule import ConfigRule
+from rdklib.errors import InvalidParametersError, PutEvaluationsError
+from rdklib.profiling import ProfilingHook
 
 import importlib
 
@@ -120,6 +122,21 @@ class rdklibEvaluatorTest(unittest.TestCase):
         }
         self.assertDictEqual(response, resp_expected)
 
+    @patch.object(CODE, "process_periodic_evaluations_list", MagicMock(side_effect=PutEvaluationsError("some-error")))
+    def test_evaluator_handle_put_evaluations_error(self):
+        """Evaluations rejected by AWS Config should be reported as an internal error, not raised."""
+        rule = MagicMock()
+        response = CODE.Evaluator(rule).handle(generate_event("ScheduledNotification"), {})
+        self.assertDictEqual(
+            response,
+            {
+                "internalErrorMessage": "Unexpected error while reporting the evaluations",
+                "internalErrorDetails": "some-error",
+                "customerErrorMessage": None,
+                "customerErrorCode": None,
+            },
+        )
+
     def test_evaluator_handle_valueerror_error(self):
         event = generate_event("ScheduledNotification")
         rule = MagicMock()
@@ -183,6 +200,115 @@ class rdklibEvaluatorTest(unittest.TestCase):
         response = evaluator.handle(event, {})
         self.assertTrue(response)
 
+    @patch.object(CODE, "process_periodic_evaluations_list", MagicMock(return_value=True))
+    def test_evaluator_handle_cache_rule_parameters(self):
+        CODE.clear_rule_parameters_cache()
+        rule = MagicMock()
+        rule.evaluate_parameters.return_value = "some-param"
+        event = generate_event("ScheduledNotification")
+
+        # Not cached by default
+        CODE.Evaluator(rule).handle(event, {})
+        CODE.Evaluator(rule).handle(event, {})
+        self.assertEqual(rule.evaluate_parameters.call_count, 2)
+
+        # Cached across evaluators for the same rule parameters
+        rule.reset_mock()
+        CODE.Evaluator(rule, cache_rule_parameters=True).handle(event, {})
+        CODE.Evaluator(rule, cache_rule_parameters=True).handle(event, {})
+        self.assertEqual(rule.evaluate_parameters.call_count, 1)
+        rule.evaluate_periodic.assert_called_with(event, unittest.mock.ANY, "some-param")
+
+        # Different rule parameters are evaluated again
+        other_event = generate_event("ScheduledNotification")
+        other_event["ruleParameters"] = json.dumps({"param_key": "other_value"})
+        CODE.Evaluator(rule, cache_rule_parameters=True).handle(other_event, {})
+        self.assertEqual(rule.evaluate_parameters.call_count, 2)
+
+        # Other rule objects are evaluated again
+        other_rule = MagicMock()
+        other_rule.evaluate_parameters.return_value = "other-param"
+        CODE.Evaluator(other_rule, cache_rule_parameters=True).handle(event, {})
+        other_rule.evaluate_periodic.assert_called_with(event, unittest.mock.ANY, "other-param")
+
+    @patch.object(CODE, "process_periodic_evaluations_list", MagicMock(return_value=True))
+    def test_evaluator_handle_cache_rule_parameters_copy(self):
+        """Changes made by the rule to its cached parameters should not be seen by the next invocations."""
+        CODE.clear_rule_parameters_cache()
+        rule = MagicMock()
+        rule.evaluate_parameters.return_value = {"some-key": ["some-value"]}
+        values_seen = []
+
+        def evaluate_periodic(event, client_factory, valid_rule_parameters):
+            values_seen.append(list(valid_rule_parameters["some-key"]))
+            valid_rule_parameters["some-key"].append("other-value")
+
+        rule.evaluate_periodic.side_effect = evaluate_periodic
+        event = generate_event("ScheduledNotification")
+        for _ in range(2):
+            CODE.Evaluator(rule, cache_rule_parameters=True).handle(event, {})
+        self.assertEqual(values_seen, [["some-value"], ["some-value"]])
+        self.assertEqual(rule.evaluate_parameters.call_count, 1)
+
+    def test_evaluator_handle_cache_rule_parameters_error(self):
+        CODE.clear_rule_parameters_cache()
+        rule = MagicMock()
+        rule.evaluate_parameters.side_effect = InvalidParametersError("some-error")
+        event = generate_event("ScheduledNotification")
+        for _ in range(2):
+            response = CODE.Evaluator(rule, cache_rule_parameters=True).handle(event, {})
+            self.assertEqual(response["customerErrorCode"], "InvalidParameterValueException")
+            self.assertEqual(response["customerErrorMessage"], "some-error")
+        self.assertEqual(rule.evaluate_parameters.call_count, 1)
+
+    @patch.object(CODE.metrics, "METRICS_ENABLED", True)
+    @patch.object(CODE, "process_periodic_evaluations_list", MagicMock(return_value=[]))
+    def test_evaluator_handle_metrics(self):
+        rule = MagicMock()
+        evaluator = CODE.Evaluator(rule)
+        event = generate_event("ScheduledNotification")
+        event["configRuleName"] = "some-rule-name"
+        with patch("builtins.print") as print_mock:
+            evaluator.handle(event, {})
+        emf = json.loads(print_mock.call_args[0][0])
+        self.assertEqual(emf["RuleName"], "some-rule-name")
+        for stage in [
+            "Invocation",
+            "ClientFactorySetup",
+            "EvaluateParameters",
+            "EvaluatePeriodic",
+            "ReportEvaluations",
+        ]:
+            self.assertIn(stage, emf)
+        self.assertIsNone(CODE.metrics._current)
+
+    @patch.object(CODE, "process_periodic_evaluations_list", MagicMock(return_value=[]))
+    def test_evaluator_handle_profiling_hook(self):
+        rule = MagicMock()
+        hook = MagicMock()
+        evaluator = CODE.Evaluator(rule, profiling_hook=hook)
+        evaluator.handle(generate_event("ScheduledNotification"), {})
+        hook.profile.assert_called_once_with("evaluate_periodic")
+        rule.evaluate_periodic.assert_called_once()
+
+    def test_evaluator_handle_profiling_hook_generator(self):
+        """The body of a rule yielding its evaluations should run while being profiled."""
+        hook = RecordingProfilingHook()
+
+        class GeneratorRule(ConfigRule):
+            def evaluate_periodic(self, event, client_factory, valid_rule_parameters):
+                for i in range(3):
+                    hook.profiled_evaluations.append(hook.active)
+                    yield CODE.Evaluation(CODE.ComplianceType.COMPLIANT, str(i), "AWS::EC2::Instance")
+
+        def consume(event, client_factory, compliance_result, rule, ordering_timestamp, max_workers):
+            return list(compliance_result)
+
+        with patch.object(CODE, "process_periodic_evaluations_list", consume):
+            CODE.Evaluator(GeneratorRule(), profiling_hook=hook).handle(generate_event("ScheduledNotification"), {})
+        self.assertEqual(hook.profiled_evaluations, [True, True, True])
+        self.assertFalse(hook.active)
+
     @patch.object(CODE, "inflate_oversized_notification", MagicMock(return_value="some-notification"))
     def test_init_event(self):
         event = generate_event("some-msg-type")
@@ -194,6 +320,18 @@ class rdklibEvaluatorTest(unittest.TestCase):
         self.assertEqual(response, "some-notification")
 
 
+class RecordingProfilingHook(ProfilingHook):
+    def __init__(self):
+        self.active = False
+        self.profiled_evaluations = []
+
+    def start(self, name):
+        self.active = True
+
+    def stop(self, name):
+        self.active = False
+
+
 def generate_event(message_type):
     invoking_event = {"messageType": message_type}
     event = {
@@ -0,0 +1,93 @@
+import importlib
+import json
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+CODE = importlib.import_module("rdklib.invocationcontext")
+
+from rdklib.configrule import ConfigRule
+
+
+class TEST_RULE_EMPTY(ConfigRule):
+    pass
+
+
+class TEST_RULE_CHANGED(ConfigRule):
+    def get_execution_role_arn(self, event):
+        return "Some_ARN"
+
+    def get_assume_role_region(self, event):
+        return "some-region"
+
+    def get_assume_role_mode(self, event):
+        return False
+
+
+def generate_event(rule_parameters=None):
+    event = {
+        "executionRoleArn": "arn:aws:iam::123456789012:role/some-role-path",
+        "invokingEvent": json.dumps({"messageType": "ScheduledNotification"}),
+    }
+    if rule_parameters is not None:
+        event["ruleParameters"] = json.dumps(rule_parameters)
+    return event
+
+
+class rdklibInvocationContextTest(unittest.TestCase):
+    def test_invocation_context_default_rule(self):
+        """The default getters should be computed from rule parameters parsed once."""
+        event = generate_event(
+            {"ExecutionRoleName": "some-role-name", "ExecutionRoleRegion": "us-west-2", "AssumeRoleMode": "false"}
+        )
+        with patch.object(CODE.json, "loads", MagicMock(side_effect=json.loads)) as json_loads:
+            invocation = CODE.InvocationContext(event, TEST_RULE_EMPTY())
+            # Once for the invoking event, once for the rule parameters
+            self.assertEqual(json_loads.call_count, 2)
+        self.assertDictEqual(invocation.invoking_event, {"messageType": "ScheduledNotification"})
+        self.assertDictEqual(
+            invocation.rule_parameters,
+            {"ExecutionRoleName": "some-role-name", "ExecutionRoleRegion": "us-west-2", "AssumeRoleMode": "false"},
+        )
+        self.assertEqual(invocation.execution_role_arn, "arn:aws:iam::123456789012:role/some-role-name")
+        self.assertEqual(invocation.assume_role_region, "us-west-2")
+        self.assertFalse(invocation.assume_role_mode)
+
+    def test_invocation_context_no_rule_parameters(self):
+        """The defaults should apply when the event has no rule parameters."""
+        invocation = CODE.InvocationContext(generate_event(), TEST_RULE_EMPTY())
+        self.assertDictEqual(invocation.rule_parameters, {})
+        self.assertEqual(invocation.execution_role_arn, "arn:aws:iam::123456789012:role/some-role-path")
+        self.assertIsNone(invocation.assume_role_region)
+        self.assertTrue(invocation.assume_role_mode)
+
+    def test_invocation_context_overridden_getters(self):
+        """Getters overridden by the rule should still be called."""
+        invocation = CODE.InvocationContext(generate_event({"ExecutionRoleRegion": "us-west-2"}), TEST_RULE_CHANGED())
+        self.assertEqual(invocation.execution_role_arn, "Some_ARN")
+        self.assertEqual(invocation.assume_role_region, "some-region")
+        self.assertFalse(invocation.assume_role_mode)
+
+        rule = TEST_RULE_EMPTY()
+        rule.get_assume_role_region = MagicMock(return_value="some-other-region")
+        invocation = CODE.InvocationContext(generate_event(), rule)
+        self.assertEqual(invocation.assume_role_region, "some-other-region")
+        rule.get_assume_role_region.assert_called_once()
+
+    def test_invocation_context_ordering_timestamp(self):
+        """The ordering timestamp should come from the invoking event, when it has one."""
+        event = generate_event()
+        self.assertIsNone(CODE.InvocationContext(event, TEST_RULE_EMPTY()).get_ordering_timestamp())
+        event["invokingEvent"] = json.dumps({"notificationCreationTime": "2017-12-23T22:11:18.158Z"})
+        invocation = CODE.InvocationContext(event, TEST_RULE_EMPTY())
+        self.assertEqual(invocation.get_ordering_timestamp(), "2017-12-23T22:11:18.158Z")
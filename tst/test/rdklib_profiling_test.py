@@ -0,0 +1,74 @@
+import contextlib
+import importlib
+import io
+import os
+import pstats
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+CODE = importlib.import_module("rdklib.profiling")
+
+
+def some_slow_function():
+    return sum(i * i for i in range(10000))
+
+
+class rdklibProfilingTest(unittest.TestCase):
+    def test_profiling_hook(self):
+        """profile() should call start() and stop() around the block, even when it raises."""
+        calls = []
+
+        class RecordingHook(CODE.ProfilingHook):
+            def start(self, name):
+                calls.append(("start", name))
+
+            def stop(self, name):
+                calls.append(("stop", name))
+
+        hook = RecordingHook()
+        with hook.profile("evaluate_change"):
+            calls.append("body")
+        with self.assertRaises(ValueError):
+            with hook.profile("evaluate_periodic"):
+                raise ValueError("some-error")
+        self.assertEqual(
+            calls,
+            [
+                ("start", "evaluate_change"),
+                "body",
+                ("stop", "evaluate_change"),
+                ("start", "evaluate_periodic"),
+                ("stop", "evaluate_periodic"),
+            ],
+        )
+
+    def test_cprofile_hook(self):
+        """The hotspots should be printed, and written as a pstats file when an output directory is given."""
+        with tempfile.TemporaryDirectory() as output_dir:
+            hook = CODE.CProfileHook(top_n=5, output_dir=output_dir)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                with hook.profile("evaluate_periodic"):
+                    some_slow_function()
+            summary = output.getvalue()
+            self.assertTrue(summary.startswith("Profile of evaluate_periodic:"))
+            self.assertIn("some_slow_function", summary)
+            self.assertEqual(os.path.dirname(hook.last_stats_file), output_dir)
+            self.assertIn("some_slow_function", str(pstats.Stats(hook.last_stats_file).stats))
+
+    def test_get_default_profiling_hook(self):
+        with patch.object(CODE, "PROFILING_ENABLED", False):
+            self.assertIsNone(CODE.get_default_profiling_hook())
+        with patch.object(CODE, "PROFILING_ENABLED", True):
+            self.assertIsInstance(CODE.get_default_profiling_hook(), CODE.CProfileHook)
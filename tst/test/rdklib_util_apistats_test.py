@@ -0,0 +1,95 @@
+import importlib
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+import boto3
+import botocore
+from botocore.stub import Stubber
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+CODE = importlib.import_module("rdklib.util.apistats")
+
+
+def build_config_client():
+    return boto3.session.Session().client(
+        "config", region_name="us-east-1", aws_access_key_id="some-key-id", aws_secret_access_key="some-secret"
+    )
+
+
+class rdklibUtilApiStatsTest(unittest.TestCase):
+    def tearDown(self):
+        CODE.stop_collection()
+
+    def test_api_call_stats_hooks(self):
+        """Calls and errors should be recorded per operation, only while collecting."""
+        client = build_config_client()
+        CODE.register_hooks(client)
+        CODE.register_hooks(client)
+
+        with Stubber(client) as stubber:
+            stubber.add_response("describe_config_rules", {"ConfigRules": []})
+            client.describe_config_rules()
+
+            stats = CODE.start_collection()
+            self.assertIs(CODE.get_current_stats(), stats)
+            for _ in range(2):
+                stubber.add_response("describe_config_rules", {"ConfigRules": []})
+                client.describe_config_rules()
+            stubber.add_client_error("put_evaluations", service_error_code="ThrottlingException")
+            with self.assertRaises(botocore.exceptions.ClientError):
+                client.put_evaluations(ResultToken="some-token")
+
+        summary = CODE.stop_collection().get_summary()
+        self.assertIsNone(CODE.get_current_stats())
+        self.assertEqual(sorted(summary), ["config.DescribeConfigRules", "config.PutEvaluations"])
+        self.assertEqual(summary["config.DescribeConfigRules"]["Calls"], 2)
+        self.assertEqual(summary["config.DescribeConfigRules"]["Errors"], 0)
+        self.assertEqual(sum(summary["config.DescribeConfigRules"]["LatencyHistogram"]), 2)
+        self.assertEqual(summary["config.PutEvaluations"]["Calls"], 1)
+        self.assertEqual(summary["config.PutEvaluations"]["Errors"], 1)
+
+    def test_register_hooks_without_events(self):
+        """Clients without botocore events, e.g. test doubles, should be left alone."""
+        CODE.register_hooks(object())
+
+    def test_needs_retry(self):
+        """Throttled attempts should be counted, without asking for a retry."""
+        stats = CODE.start_collection()
+        operation = MagicMock()
+        operation.name = "PutEvaluations"
+        operation.service_model.service_name = "config"
+        throttled = (MagicMock(), {"Error": {"Code": "ThrottlingException"}})
+        self.assertIsNone(CODE.needs_retry(response=throttled, operation=operation, attempts=1))
+        self.assertIsNone(CODE.needs_retry(response=(MagicMock(), {}), operation=operation, attempts=2))
+        self.assertIsNone(CODE.needs_retry(response=None, operation=operation, caught_exception=Exception()))
+        self.assertEqual(stats.get_summary()["config.PutEvaluations"]["Throttles"], 1)
+
+    def test_operation_stats_histogram(self):
+        stats = CODE.ApiCallStats()
+        for milliseconds in [1, 10, 11, 6000]:
+            stats.record_call("config.PutEvaluations", milliseconds, retries=1)
+        stats.record_call("ec2.DescribeInstances", 10000)
+        summary = stats.get_summary()["config.PutEvaluations"]
+        self.assertEqual(summary["LatencyHistogram"], [2, 1, 0, 0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(summary["Retries"], 4)
+        self.assertEqual(summary["MaxMilliseconds"], 6000)
+        self.assertEqual(stats.get_slowest_operations(), ["ec2.DescribeInstances", "config.PutEvaluations"])
+
+    def test_add_to_metrics(self):
+        stats = CODE.ApiCallStats()
+        stats.record_call("config.PutEvaluations", 12.5)
+        metrics = MagicMock()
+        stats.add_to_metrics(metrics)
+        metrics.add_count.assert_any_call("config.PutEvaluations.Calls", 1)
+        metrics.add_duration.assert_called_once_with("config.PutEvaluations.Latency", 12.5)
+        metrics.set_property.assert_called_once_with("ApiCallStats", stats.get_summary())
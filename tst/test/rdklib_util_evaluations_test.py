@@ -1,3 +1,4 @@
+import datetime
 import importlib
 import json
 import os
@@ -7,7 +8,9 @@ from importlib.abc import MetaPathFinder
 from unittest.mock import MagicMock, patch
 
 from rdklib.configrule import ConfigRule
-from rdklib.evaluation import ComplianceType, Evaluation
+from rdklib.evaluation import ComplianceType, Evaluation, EvaluationBatch, PartialEvaluationList
+from rdklib.util.external import process_evaluations
+from rdklibtest import FakeConfigClient, create_test_scheduled_event
 
 # Get the absolute path of the current script
 current_script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -28,14 +31,10 @@ def mock_get_client(*args, **kwargs):
     return CLIENT_MOCK
 
 
-def return_same_value(event, client_factory, evaluations):
+def return_same_value(event, client_factory, evaluations, max_workers=None):
     return evaluations
 
 
-def return_first_item(event, client_factory, evaluations):
-    return evaluations[0]
-
-
 class FailLoader(MetaPathFinder):
     """To raise ImportError for test.
 
@@ -131,7 +130,6 @@ class rdklibUtilEvaluationsTest(unittest.TestCase):
         for i, resp in enumerate(response):
             self.assertDictEqual(resp, resp_expected[i])
 
-    @patch.object(CODE, "clean_up_old_evaluations", MagicMock(side_effect=return_first_item))
     def test_process_periodic_evaluations_list(self):
         class SomeRuleClass(ConfigRule):
             pass
@@ -193,16 +191,124 @@ class rdklibUtilEvaluationsTest(unittest.TestCase):
         for i, resp in enumerate(response):
             self.assertDictEqual(resp, resp_expected[i])
 
-        # Test execution of clean_up_old_evaluations()
+        # Old evaluations are cleaned up after the latest ones
         rule.delete_old_evaluations_on_scheduled_notification = True
-        response = CODE.process_periodic_evaluations_list(self.event, {}, eval_result_combine, rule)
-        resp_expected = {
-            "ComplianceResourceId": "some-resource-id",
-            "ComplianceResourceType": "some-resource-type",
-            "ComplianceType": "COMPLIANT",
-            "OrderingTimestamp": "some-date-time",
-        }
-        self.assertDictEqual(response, resp_expected)
+        clean_up_evaluation = {"ComplianceResourceId": "some-old-resource-id", "ComplianceType": "NOT_APPLICABLE"}
+        get_clean_up = MagicMock(return_value=[clean_up_evaluation])
+        with patch.object(CODE, "get_old_evaluations_to_clean_up", get_clean_up):
+            response = CODE.process_periodic_evaluations_list(self.event, {}, eval_result_combine, rule)
+            self.assertEqual(response, resp_expected + [clean_up_evaluation])
+        get_clean_up.assert_called_once_with(
+            self.event, {}, {("some-resource-type", "some-resource-id")}, "some-date-time"
+        )
+
+    def test_process_periodic_evaluations_list_sent(self):
+        """The evaluations of a list should be returned once sent to AWS Config, with the clean-up ones."""
+
+        class SomeRuleClass(ConfigRule):
+            pass
+
+        config_client = FakeConfigClient()
+        config_client.add_evaluation_result("myrule", "some-resource-type", "some-old-resource-id", "COMPLIANT")
+        client_factory = MagicMock()
+        client_factory.build_client.return_value = config_client
+        event = create_test_scheduled_event()
+        event["resultToken"] = "token"
+        eval_result = [Evaluation(ComplianceType.COMPLIANT, "some-resource-id", "some-resource-type")]
+        with patch.object(CODE, "process_evaluations", process_evaluations):
+            response = CODE.process_periodic_evaluations_list(event, client_factory, eval_result, SomeRuleClass())
+
+        self.assertEqual(
+            [(resp["ComplianceResourceId"], resp["ComplianceType"]) for resp in response],
+            [("some-resource-id", "COMPLIANT"), ("some-old-resource-id", "NOT_APPLICABLE")],
+        )
+        self.assertEqual(
+            [
+                result["EvaluationResultIdentifier"]["EvaluationResultQualifier"]["ResourceId"]
+                for result in config_client.get_evaluation_results("myrule")
+            ],
+            ["some-resource-id"],
+        )
+
+    def test_process_periodic_evaluations_clean_up_pages(self):
+        """Every old evaluation should be cleaned up, even though the clean-up changes the results being paginated."""
+
+        class SomeRuleClass(ConfigRule):
+            pass
+
+        event = create_test_scheduled_event()
+        event["resultToken"] = "token"
+        for compliance_result in [lambda: [], lambda: iter([])]:
+            config_client = FakeConfigClient()
+            for i in range(250):
+                config_client.add_evaluation_result("myrule", "some-resource-type", str(i), "COMPLIANT")
+            client_factory = MagicMock()
+            client_factory.build_client.return_value = config_client
+            with patch.object(CODE, "process_evaluations", process_evaluations):
+                CODE.process_periodic_evaluations_list(event, client_factory, compliance_result(), SomeRuleClass())
+            self.assertEqual(config_client.get_evaluation_results("myrule"), [])
+
+    def test_process_evaluations_list_generator(self):
+        materialize = MagicMock(
+            side_effect=lambda event, client_factory, evaluations, max_workers=None: list(evaluations)
+        )
+        with patch.object(CODE, "process_evaluations", materialize):
+
+            class SomeRuleClass(ConfigRule):
+                pass
+
+            rule = SomeRuleClass()
+            rule.delete_old_evaluations_on_scheduled_notification = False
+            config_item = {
+                "resourceType": "some-resource-type",
+                "resourceId": "some-resource-id",
+                "configurationItemCaptureTime": "some-date-time",
+            }
+
+            def generate_evaluations():
+                yield Evaluation(ComplianceType.COMPLIANT, "some-resource-id", "some-resource-type")
+                yield Evaluation(ComplianceType.NON_COMPLIANT, "some-other-resource-id", "some-resource-type")
+
+            response = CODE.process_periodic_evaluations_list(self.event, {}, generate_evaluations(), rule)
+            self.assertEqual(
+                [resp["ComplianceResourceId"] for resp in response], ["some-resource-id", "some-other-resource-id"]
+            )
+            self.assertEqual([resp["OrderingTimestamp"] for resp in response], ["some-date-time", "some-date-time"])
+
+            response = CODE.process_event_evaluations_list({}, {}, generate_evaluations(), config_item)
+            self.assertEqual([resp["ComplianceType"] for resp in response], ["COMPLIANT", "NON_COMPLIANT"])
+
+            # Yielded items are validated as well
+            with self.assertRaises(Exception) as context:
+                CODE.process_periodic_evaluations_list(self.event, {}, iter(["string"]), rule)
+            self.assertTrue(
+                "The return statement from evaluate_periodic() is not a list of Evaluation() object."
+                in str(context.exception)
+            )
+
+            # Old evaluations are cleaned up once all the yielded evaluations are sent
+            rule.delete_old_evaluations_on_scheduled_notification = True
+            CLIENT_MOCK.get_compliance_details_by_config_rule.return_value = {
+                "EvaluationResults": [
+                    {
+                        "EvaluationResultIdentifier": {
+                            "EvaluationResultQualifier": {
+                                "ResourceId": "some-old-resource-id",
+                                "ResourceType": "some-resource-type",
+                            }
+                        }
+                    }
+                ]
+            }
+            response = CODE.process_periodic_evaluations_list(self.event, CLIENT_FACTORY, generate_evaluations(), rule)
+            self.assertEqual(
+                [(resp["ComplianceResourceId"], resp["ComplianceType"]) for resp in response],
+                [
+                    ("some-resource-id", "COMPLIANT"),
+                    ("some-other-resource-id", "NON_COMPLIANT"),
+                    ("some-old-resource-id", "NOT_APPLICABLE"),
+                ],
+            )
 
     def test_clean_up_old_evaluations(self):
         new_eval = [Evaluation(ComplianceType.COMPLIANT, "some-resource-id", "some-resource-type").get_json()]
@@ -258,3 +364,239 @@ class rdklibUtilEvaluationsTest(unittest.TestCase):
         ]
         for i, resp in enumerate(response):
             self.assertDictEqual(resp, resp_expected[i])
+
+    def test_process_periodic_evaluations_list_parses_timestamp_once(self):
+        """The ordering timestamp should be parsed once per run, and not at all when it is provided."""
+
+        class SomeRuleClass(ConfigRule):
+            pass
+
+        CLIENT_MOCK.get_compliance_details_by_config_rule.return_value = {
+            "EvaluationResults": [
+                {
+                    "EvaluationResultIdentifier": {
+                        "EvaluationResultQualifier": {"ResourceId": "old-{}".format(i), "ResourceType": "some-type"}
+                    }
+                }
+                for i in range(5)
+            ]
+        }
+        with patch.object(
+            CODE, "get_periodic_ordering_timestamp", MagicMock(side_effect=CODE.get_periodic_ordering_timestamp)
+        ) as get_timestamp:
+            for compliance_result in [
+                [Evaluation(ComplianceType.COMPLIANT, str(i), "some-type") for i in range(10)],
+                (Evaluation(ComplianceType.COMPLIANT, str(i), "some-type") for i in range(10)),
+            ]:
+                get_timestamp.reset_mock()
+                response = list(
+                    CODE.process_periodic_evaluations_list(
+                        self.event, CLIENT_FACTORY, compliance_result, SomeRuleClass()
+                    )
+                )
+                self.assertEqual(get_timestamp.call_count, 1)
+                self.assertEqual(len(response), 15)
+                self.assertTrue(all(resp["OrderingTimestamp"] == "some-date-time" for resp in response))
+
+            get_timestamp.reset_mock()
+            response = CODE.process_periodic_evaluations_list(
+                self.event,
+                CLIENT_FACTORY,
+                [Evaluation(ComplianceType.COMPLIANT, str(i), "some-type") for i in range(10)],
+                SomeRuleClass(),
+                "provided-date-time",
+            )
+            get_timestamp.assert_not_called()
+            self.assertTrue(all(resp["OrderingTimestamp"] == "provided-date-time" for resp in response))
+
+    def test_clean_up_old_evaluations_resource_type(self):
+        """Resources sharing an id but not a type should be cleaned up separately."""
+        new_eval = [Evaluation(ComplianceType.COMPLIANT, "some-resource-id", "some-resource-type").get_json()]
+        CLIENT_MOCK.get_compliance_details_by_config_rule.return_value = {
+            "EvaluationResults": [
+                {
+                    "EvaluationResultIdentifier": {
+                        "EvaluationResultQualifier": {
+                            "ResourceId": "some-resource-id",
+                            "ResourceType": resource_type,
+                        }
+                    }
+                }
+                for resource_type in ["some-resource-type", "some-other-resource-type"]
+            ]
+        }
+        response = CODE.clean_up_old_evaluations(self.event, CLIENT_FACTORY, new_eval)
+        self.assertEqual(
+            [(resp["ComplianceResourceType"], resp["ComplianceType"]) for resp in response],
+            [("some-other-resource-type", "NOT_APPLICABLE"), ("some-resource-type", "COMPLIANT")],
+        )
+
+    def test_iter_old_evaluations_to_clean_up(self):
+        """Every page of old evaluations should be read before the first one is yielded."""
+        pages = [
+            {
+                "EvaluationResults": [
+                    {
+                        "EvaluationResultIdentifier": {
+                            "EvaluationResultQualifier": {
+                                "ResourceId": "some-resource-id-{}".format(i),
+                                "ResourceType": "some-resource-type",
+                            }
+                        }
+                    }
+                ],
+                "NextToken": "some-token-{}".format(i + 1) if i < 2 else "",
+            }
+            for i in range(3)
+        ]
+        config_client = MagicMock()
+        config_client.get_compliance_details_by_config_rule.side_effect = pages
+        with patch.object(CLIENT_FACTORY, "build_client", MagicMock(return_value=config_client)):
+            cleaned = CODE.iter_old_evaluations_to_clean_up(
+                self.event, CLIENT_FACTORY, {("some-resource-type", "some-resource-id-1")}
+            )
+            config_client.get_compliance_details_by_config_rule.assert_not_called()
+            self.assertEqual(next(cleaned)["ComplianceResourceId"], "some-resource-id-0")
+            self.assertEqual(config_client.get_compliance_details_by_config_rule.call_count, 3)
+            self.assertEqual([resp["ComplianceResourceId"] for resp in cleaned], ["some-resource-id-2"])
+        self.assertEqual(
+            [call.kwargs["NextToken"] for call in config_client.get_compliance_details_by_config_rule.call_args_list],
+            ["", "some-token-1", "some-token-2"],
+        )
+
+    def test_process_periodic_evaluations_list_changed_only(self):
+        """Only new or changed evaluations should be sent, unless the recorded result is too old."""
+
+        class SomeRuleClass(ConfigRule):
+            report_changed_evaluations_only = True
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        def old_result(resource_id, compliance_type, annotation=None, age_seconds=0):
+            result = {
+                "EvaluationResultIdentifier": {
+                    "EvaluationResultQualifier": {"ResourceId": resource_id, "ResourceType": "some-resource-type"}
+                },
+                "ComplianceType": compliance_type,
+                "ResultRecordedTime": now - datetime.timedelta(seconds=age_seconds),
+            }
+            if annotation:
+                result["Annotation"] = annotation
+            return result
+
+        CLIENT_MOCK.get_compliance_details_by_config_rule.return_value = {
+            "EvaluationResults": [
+                old_result("unchanged", "COMPLIANT"),
+                old_result("unchanged-annotation", "NON_COMPLIANT", "some-annotation"),
+                old_result("changed-compliance", "COMPLIANT"),
+                old_result("changed-annotation", "NON_COMPLIANT", "some-annotation"),
+                old_result("stale", "COMPLIANT", age_seconds=SomeRuleClass.changed_evaluations_refresh_seconds + 1),
+                old_result("deleted", "COMPLIANT"),
+            ]
+        }
+        eval_result = [
+            Evaluation(ComplianceType.COMPLIANT, "unchanged", "some-resource-type"),
+            Evaluation(ComplianceType.NON_COMPLIANT, "unchanged-annotation", "some-resource-type", "some-annotation"),
+            Evaluation(ComplianceType.NON_COMPLIANT, "changed-compliance", "some-resource-type"),
+            Evaluation(ComplianceType.NON_COMPLIANT, "changed-annotation", "some-resource-type", "other-annotation"),
+            Evaluation(ComplianceType.COMPLIANT, "stale", "some-resource-type"),
+            Evaluation(ComplianceType.COMPLIANT, "new", "some-resource-type"),
+        ]
+        expected = [
+            ("changed-compliance", "NON_COMPLIANT"),
+            ("changed-annotation", "NON_COMPLIANT"),
+            ("stale", "COMPLIANT"),
+            ("new", "COMPLIANT"),
+            ("deleted", "NOT_APPLICABLE"),
+        ]
+
+        rule = SomeRuleClass()
+        with patch.object(CODE.metrics, "count") as count_mock:
+            response = CODE.process_periodic_evaluations_list(self.event, CLIENT_FACTORY, eval_result, rule)
+        self.assertEqual([(resp["ComplianceResourceId"], resp["ComplianceType"]) for resp in response], expected)
+        count_mock.assert_any_call("EvaluationsSkipped", 2)
+
+        # Same result when streaming the evaluations
+        materialize = MagicMock(
+            side_effect=lambda event, client_factory, evaluations, max_workers=None: list(evaluations)
+        )
+        with patch.object(CODE, "process_evaluations", materialize):
+            response = CODE.process_periodic_evaluations_list(self.event, CLIENT_FACTORY, iter(eval_result), rule)
+        self.assertEqual([(resp["ComplianceResourceId"], resp["ComplianceType"]) for resp in response], expected)
+
+        # No clean up when disabled
+        rule.delete_old_evaluations_on_scheduled_notification = False
+        response = CODE.process_periodic_evaluations_list(self.event, CLIENT_FACTORY, eval_result, rule)
+        self.assertEqual([(resp["ComplianceResourceId"], resp["ComplianceType"]) for resp in response], expected[:-1])
+
+    def test_process_periodic_evaluations_list_partial(self):
+        """Old evaluations should not be cleaned up when the evaluations of the run are partial."""
+
+        class SomeRuleClass(ConfigRule):
+            pass
+
+        CLIENT_MOCK.get_compliance_details_by_config_rule.return_value = {
+            "EvaluationResults": [
+                {
+                    "EvaluationResultIdentifier": {
+                        "EvaluationResultQualifier": {
+                            "ResourceId": "not-evaluated",
+                            "ResourceType": "some-resource-type",
+                        }
+                    },
+                    "ComplianceType": "COMPLIANT",
+                }
+            ]
+        }
+        rule = SomeRuleClass()
+        for report_changed_evaluations_only in [False, True]:
+            rule.report_changed_evaluations_only = report_changed_evaluations_only
+            eval_result = PartialEvaluationList(
+                [Evaluation(ComplianceType.COMPLIANT, "evaluated", "some-resource-type")]
+            )
+            response = CODE.process_periodic_evaluations_list(self.event, CLIENT_FACTORY, eval_result, rule)
+            self.assertEqual([resp["ComplianceResourceId"] for resp in response], ["evaluated"])
+
+            response = CODE.process_periodic_evaluations_list(self.event, CLIENT_FACTORY, list(eval_result), rule)
+            self.assertEqual(
+                sorted((resp["ComplianceResourceId"], resp["ComplianceType"]) for resp in response),
+                [("evaluated", "COMPLIANT"), ("not-evaluated", "NOT_APPLICABLE")],
+            )
+
+    def test_process_periodic_evaluations_list_batch(self):
+        """An EvaluationBatch should be validated and sent like a list of evaluations."""
+
+        class SomeRuleClass(ConfigRule):
+            delete_old_evaluations_on_scheduled_notification = False
+
+        batch = EvaluationBatch()
+        batch.add(ComplianceType.COMPLIANT, "some-resource-id", "some-resource-type")
+        batch.add(ComplianceType.NON_COMPLIANT, "some-other-resource-id", "some-resource-type", "some-annotation")
+        materialize = MagicMock(
+            side_effect=lambda event, client_factory, evaluations, max_workers=None: list(evaluations)
+        )
+        with patch.object(CODE, "process_evaluations", materialize):
+            response = CODE.process_periodic_evaluations_list(self.event, CLIENT_FACTORY, batch, SomeRuleClass())
+            self.assertEqual(
+                response,
+                [
+                    {
+                        "ComplianceResourceId": "some-resource-id",
+                        "ComplianceResourceType": "some-resource-type",
+                        "ComplianceType": "COMPLIANT",
+                        "OrderingTimestamp": "some-date-time",
+                    },
+                    {
+                        "ComplianceResourceId": "some-other-resource-id",
+                        "ComplianceResourceType": "some-resource-type",
+                        "ComplianceType": "NON_COMPLIANT",
+                        "OrderingTimestamp": "some-date-time",
+                        "Annotation": "some-annotation",
+                    },
+                ],
+            )
+
+            batch.add(ComplianceType.COMPLIANT, None, "some-resource-type")
+            with self.assertRaises(Exception) as context:
+                CODE.process_periodic_evaluations_list(self.event, CLIENT_FACTORY, batch, SomeRuleClass())
+            self.assertTrue("Missing complianceResourceId from an evaluation result." in str(context.exception))
@@ -1,6 +1,9 @@
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
 
+import botocore
+
 import importlib
 
 import sys
@@ -25,12 +28,13 @@ def mock_get_client(*args, **kwargs):
     return CLIENT_MOCK
 
 
-def return_same_value(Evaluations, ResultToken, TestMode):
-    return Evaluations
+def put_evaluations_response(Evaluations, ResultToken, TestMode):
+    return {"FailedEvaluations": []}
 
 
 @patch.object(CLIENT_FACTORY, "build_client", MagicMock(side_effect=mock_get_client))
-@patch.object(CLIENT_MOCK, "put_evaluations", MagicMock(side_effect=return_same_value))
+@patch.object(CLIENT_MOCK, "put_evaluations", MagicMock(side_effect=put_evaluations_response))
+@patch.object(CODE.time, "sleep", MagicMock())
 class rdklibUtilExternalTest(unittest.TestCase):
     def test_external_process_evaluations(self):
         event_not_test = {"resultToken": "NOT_TESTMODE"}
@@ -47,3 +51,163 @@ class rdklibUtilExternalTest(unittest.TestCase):
         # Evaluation not in test mode
         response = CODE.process_evaluations(event_not_test, CLIENT_FACTORY, ["some-eval"])
         self.assertEqual(response, ["some-eval"])
+
+    def test_external_process_evaluations_batches(self):
+        """Evaluations should be sent in batches of 100."""
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        evaluations = ["some-eval-{}".format(i) for i in range(250)]
+        response = CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, evaluations)
+        self.assertEqual(response, evaluations)
+        sent = [call.kwargs["Evaluations"] for call in CLIENT_MOCK.put_evaluations.call_args_list]
+        self.assertEqual([len(batch) for batch in sent], [100, 100, 50])
+        self.assertEqual(sum(sent, []), evaluations)
+
+    @patch.object(CODE, "PUT_EVALUATIONS_MAX_WORKERS", 4)
+    def test_external_process_evaluations_concurrent(self):
+        """All batches should be sent when sending concurrently."""
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        thread_ids = set()
+
+        def put_evaluations(Evaluations, ResultToken, TestMode):
+            thread_ids.add(threading.get_ident())
+            return {"FailedEvaluations": []}
+
+        CLIENT_MOCK.put_evaluations.side_effect = put_evaluations
+        evaluations = ["some-eval-{}".format(i) for i in range(1050)]
+        response = CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, evaluations)
+        self.assertEqual(response, evaluations)
+        sent = [call.kwargs["Evaluations"] for call in CLIENT_MOCK.put_evaluations.call_args_list]
+        self.assertEqual(len(sent), 11)
+        self.assertCountEqual(sum(sent, []), evaluations)
+        self.assertNotIn(threading.get_ident(), thread_ids)
+
+    @patch.object(CODE, "PUT_EVALUATIONS_MAX_WORKERS", 4)
+    def test_external_process_evaluations_concurrent_error(self):
+        """Failed batches should not prevent the other batches from being sent."""
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        error = botocore.exceptions.ClientError(
+            {"Error": {"Code": "InternalError", "Message": "some-error"}}, "operation"
+        )
+
+        def put_evaluations(Evaluations, ResultToken, TestMode):
+            if "some-eval-0" in Evaluations or "some-eval-500" in Evaluations:
+                raise error
+            return {"FailedEvaluations": []}
+
+        CLIENT_MOCK.put_evaluations.side_effect = put_evaluations
+        evaluations = ["some-eval-{}".format(i) for i in range(1000)]
+        with self.assertRaises(botocore.exceptions.ClientError) as context:
+            CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, evaluations)
+        self.assertIs(context.exception, error)
+        self.assertEqual(CLIENT_MOCK.put_evaluations.call_count, 10)
+
+    def test_external_process_evaluations_throttled(self):
+        """Throttled batches should be retried with backoff."""
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        throttled = botocore.exceptions.ClientError(
+            {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "PutEvaluations"
+        )
+        CLIENT_MOCK.put_evaluations.side_effect = [throttled, throttled, {"FailedEvaluations": []}]
+        response = CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, ["some-eval"])
+        self.assertEqual(response, ["some-eval"])
+        self.assertEqual(CLIENT_MOCK.put_evaluations.call_count, 3)
+
+        # Gives up after the maximum number of attempts
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        CLIENT_MOCK.put_evaluations.side_effect = throttled
+        with self.assertRaises(botocore.exceptions.ClientError):
+            CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, ["some-eval"])
+        self.assertEqual(CLIENT_MOCK.put_evaluations.call_count, CODE.PUT_EVALUATIONS_MAX_ATTEMPTS)
+
+        # Other errors are not retried
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        CLIENT_MOCK.put_evaluations.side_effect = botocore.exceptions.ClientError(
+            {"Error": {"Code": "InvalidResultTokenException", "Message": "some-error"}}, "PutEvaluations"
+        )
+        with self.assertRaises(botocore.exceptions.ClientError):
+            CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, ["some-eval"])
+        self.assertEqual(CLIENT_MOCK.put_evaluations.call_count, 1)
+
+    def test_external_process_evaluations_failed_evaluations(self):
+        """Only the evaluations reported in FailedEvaluations should be sent again."""
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        CLIENT_MOCK.put_evaluations.side_effect = [
+            {"FailedEvaluations": ["some-eval-1"]},
+            {"FailedEvaluations": []},
+        ]
+        response = CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, ["some-eval-0", "some-eval-1"])
+        self.assertEqual(response, ["some-eval-0", "some-eval-1"])
+        sent = [call.kwargs["Evaluations"] for call in CLIENT_MOCK.put_evaluations.call_args_list]
+        self.assertEqual(sent, [["some-eval-0", "some-eval-1"], ["some-eval-1"]])
+
+        # Evaluations still failing after the maximum number of attempts make the batch fail
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        CLIENT_MOCK.put_evaluations.side_effect = lambda **kwargs: {"FailedEvaluations": ["some-eval-1"]}
+        with patch.object(CODE.metrics, "count") as count:
+            with self.assertRaises(CODE.PutEvaluationsError):
+                CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, ["some-eval-0", "some-eval-1"])
+        self.assertEqual(CLIENT_MOCK.put_evaluations.call_count, CODE.PUT_EVALUATIONS_MAX_ATTEMPTS)
+        reported = sum(call.args[1] for call in count.call_args_list if call.args[0] == "EvaluationsReported")
+        self.assertEqual(reported, 1)
+        count.assert_any_call("EvaluationsFailed", 1)
+
+        # Also when the batches are sent from the background
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        with self.assertRaises(CODE.PutEvaluationsError):
+            CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, iter(["some-eval-0", "some-eval-1"]))
+        self.assertEqual(CLIENT_MOCK.put_evaluations.call_count, CODE.PUT_EVALUATIONS_MAX_ATTEMPTS)
+
+    def test_adaptive_rate_limiter(self):
+        """The interval between calls should grow when throttled and shrink back on success."""
+        rate_limiter = CODE.AdaptiveRateLimiter()
+        self.assertEqual(rate_limiter.interval, 0)
+        rate_limiter.throttled()
+        self.assertEqual(rate_limiter.interval, CODE.THROTTLED_MIN_INTERVAL_SECONDS)
+        rate_limiter.throttled()
+        self.assertEqual(rate_limiter.interval, CODE.THROTTLED_MIN_INTERVAL_SECONDS * 2)
+        for _ in range(100):
+            rate_limiter.throttled()
+        self.assertEqual(rate_limiter.interval, CODE.THROTTLED_MAX_INTERVAL_SECONDS)
+        for _ in range(1000):
+            rate_limiter.succeeded()
+        self.assertEqual(rate_limiter.interval, 0)
+
+    def test_external_process_evaluations_stream(self):
+        """Evaluations from an iterator should be sent in batches, in the background, as they come."""
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        produced = []
+
+        def generate_evaluations(count):
+            for i in range(count):
+                produced.append(i)
+                yield "some-eval-{}".format(i)
+
+        def put_evaluations(Evaluations, ResultToken, TestMode):
+            # At most two batches wait to be sent while the next one is produced
+            sent = 100 * (CLIENT_MOCK.put_evaluations.call_count - 1) + len(Evaluations)
+            self.assertLessEqual(len(produced), sent + 300)
+            return {"FailedEvaluations": []}
+
+        CLIENT_MOCK.put_evaluations.side_effect = put_evaluations
+        response = CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, generate_evaluations(250))
+        self.assertEqual(response, [])
+        sent = [call.kwargs["Evaluations"] for call in CLIENT_MOCK.put_evaluations.call_args_list]
+        self.assertEqual([len(batch) for batch in sent], [100, 100, 50])
+
+        # An empty iterator still reports to the result token
+        CLIENT_MOCK.put_evaluations.reset_mock()
+        CLIENT_MOCK.put_evaluations.side_effect = put_evaluations_response
+        CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, iter([]))
+        CLIENT_MOCK.put_evaluations.assert_called_once_with(Evaluations=[], ResultToken="token", TestMode=False)
+
+    @patch.object(CODE, "PUT_EVALUATIONS_MAX_WORKERS", 4)
+    def test_external_process_evaluations_stream_error(self):
+        """Errors raised while producing the evaluations should be raised as is."""
+
+        def generate_evaluations():
+            for i in range(150):
+                yield "some-eval-{}".format(i)
+            raise ValueError("some-rule-error")
+
+        with self.assertRaises(ValueError):
+            CODE.process_evaluations({"resultToken": "token"}, CLIENT_FACTORY, generate_evaluations())
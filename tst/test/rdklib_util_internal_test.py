@@ -22,6 +22,10 @@ class rdklibUtilInternalTest(unittest.TestCase):
         response = CODE.process_evaluations({}, {}, "some-value")
         self.assertEqual(response, "some-value")
 
+    def test_internal_process_evaluations_iterator(self):
+        response = CODE.process_evaluations({}, {}, iter(["some-value"]))
+        self.assertEqual(response, ["some-value"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,83 @@
+import importlib
+import json
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+CODE = importlib.import_module("rdklib.util.metrics")
+
+
+class rdklibUtilMetricsTest(unittest.TestCase):
+    def tearDown(self):
+        CODE._current = None
+
+    @patch.object(CODE, "METRICS_ENABLED", False)
+    def test_metrics_disabled(self):
+        """Nothing should be recorded nor printed when metrics are disabled."""
+        self.assertIsNone(CODE.start_invocation("some-rule-name"))
+        with CODE.stage("SomeStage"):
+            CODE.count("SomeCalls")
+        with patch("builtins.print") as print_mock:
+            self.assertIsNone(CODE.end_invocation())
+        print_mock.assert_not_called()
+
+    @patch.object(CODE, "METRICS_ENABLED", True)
+    def test_metrics_enabled(self):
+        """Stages and counts should add up and be printed as one EMF line."""
+        metrics = CODE.start_invocation("some-rule-name")
+        for _ in range(2):
+            with CODE.stage("SomeStage"):
+                CODE.count("SomeCalls")
+        CODE.count("SomeEvaluations", 100)
+        with self.assertRaises(ValueError):
+            with CODE.stage("FailingStage"):
+                raise ValueError("some-error")
+
+        with patch("builtins.print") as print_mock:
+            self.assertIs(CODE.end_invocation(), metrics)
+        self.assertIsNone(CODE._current)
+
+        emf = json.loads(print_mock.call_args[0][0])
+        self.assertEqual(emf["RuleName"], "some-rule-name")
+        self.assertEqual(emf["SomeCalls"], 2)
+        self.assertEqual(emf["SomeEvaluations"], 100)
+        self.assertGreaterEqual(emf["SomeStage"], 0)
+        self.assertIn("FailingStage", emf)
+        definition = emf["_aws"]["CloudWatchMetrics"][0]
+        self.assertEqual(definition["Namespace"], CODE.METRICS_NAMESPACE)
+        self.assertEqual(definition["Dimensions"], [["RuleName"]])
+        self.assertIn({"Name": "SomeStage", "Unit": "Milliseconds"}, definition["Metrics"])
+        self.assertIn({"Name": "SomeCalls", "Unit": "Count"}, definition["Metrics"])
+        self.assertIsInstance(emf["_aws"]["Timestamp"], int)
+
+    def test_build_emf(self):
+        metrics = CODE.InvocationMetrics("some-rule-name")
+        metrics.add_duration("SomeStage", 1.5)
+        metrics.add_duration("SomeStage", 1.0)
+        self.assertDictEqual(
+            metrics.build_emf(namespace="some-namespace", timestamp=1000),
+            {
+                "_aws": {
+                    "Timestamp": 1000,
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": "some-namespace",
+                            "Dimensions": [["RuleName"]],
+                            "Metrics": [{"Name": "SomeStage", "Unit": "Milliseconds"}],
+                        }
+                    ],
+                },
+                "RuleName": "some-rule-name",
+                "SomeStage": 2.5,
+            },
+        )
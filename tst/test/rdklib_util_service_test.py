@@ -159,10 +159,13 @@ class rdklibUtilServiceTest(unittest.TestCase):
         self.assertFalse(response)
 
     def test_inflate_oversized_notification(self):
-        CODE.get_resource_config_history = MagicMock(return_value=build_grh_response())
-        CODE.convert_into_notification_config_item = MagicMock(return_value=build_config_item("some-type"))
         invoke_event = json.loads(build_normal_event(True)["invokingEvent"])
-        response = CODE.inflate_oversized_notification({}, invoke_event)
+        with patch.object(
+            CODE, "get_resource_config_history", MagicMock(return_value=build_grh_response())
+        ), patch.object(
+            CODE, "convert_into_notification_config_item", MagicMock(return_value=build_config_item("some-type"))
+        ):
+            response = CODE.inflate_oversized_notification({}, invoke_event)
         resp_expected = {
             "configurationItem": {"configurationItemStatus": "some-type", "resourceType": "some-resource-type"},
             "notificationCreationTime": "some-time",
@@ -0,0 +1,180 @@
+import importlib
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import botocore
+
+# Get the absolute path of the current script
+current_script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Get the absolute path of the project directory
+project_dir = os.path.abspath(os.path.join(current_script_dir, "..", ".."))
+
+# Add the project directory to the Python path
+sys.path.append(project_dir)
+
+CODE = importlib.import_module("rdklibtest.fakeconfig")
+
+import rdklib.util.apistats
+import rdklib.util.evaluations
+from rdklib import ComplianceType, ConfigRule, Evaluation, Evaluator
+from rdklib.util.external import process_evaluations
+from rdklibtest import create_test_configurationchange_event, create_test_scheduled_event
+
+
+def build_evaluation(resource_id, compliance_type="COMPLIANT"):
+    return Evaluation(compliance_type, resource_id, "AWS::EC2::Instance", "some-annotation").get_json()
+
+
+class PeriodicRule(ConfigRule):
+    resource_ids = []
+
+    def evaluate_periodic(self, event, client_factory, valid_rule_parameters):
+        return [
+            Evaluation(ComplianceType.COMPLIANT, resource_id, "AWS::EC2::Instance") for resource_id in self.resource_ids
+        ]
+
+
+class ChangeRule(ConfigRule):
+    def evaluate_change(self, event, client_factory, configuration_item, valid_rule_parameters):
+        if configuration_item["configuration"]["instanceType"] == "t2.micro":
+            return [Evaluation(ComplianceType.COMPLIANT)]
+        return [Evaluation(ComplianceType.NON_COMPLIANT)]
+
+
+class rdklibtestFakeConfigTest(unittest.TestCase):
+    def test_put_evaluations(self):
+        """Accepted evaluations should become the results of the rule, 100 per put_evaluations call at most."""
+        config_client = CODE.FakeConfigClient()
+        with self.assertRaises(botocore.exceptions.ClientError) as context:
+            config_client.put_evaluations(
+                ResultToken="token", Evaluations=[build_evaluation(str(i)) for i in range(101)]
+            )
+        self.assertEqual(context.exception.response["Error"]["Code"], "ValidationException")
+
+        response = config_client.put_evaluations(
+            ResultToken="token", Evaluations=[build_evaluation(str(i)) for i in range(100)]
+        )
+        self.assertEqual(response, {"FailedEvaluations": []})
+        config_client.put_evaluations(ResultToken="token", Evaluations=[build_evaluation("0", "NOT_APPLICABLE")])
+        config_client.put_evaluations(ResultToken="TESTMODE", Evaluations=[build_evaluation("a")], TestMode=True)
+        self.assertEqual(len(config_client.get_evaluation_results("myrule")), 99)
+        self.assertEqual(config_client.calls["PutEvaluations"], 4)
+
+        config_client.bind_result_token("other-token", "other-rule")
+        config_client.put_evaluations(ResultToken="other-token", Evaluations=[build_evaluation("b")])
+        self.assertEqual(len(config_client.get_evaluation_results("other-rule")), 1)
+
+    def test_put_evaluations_record_batches(self):
+        """The evaluations of each call should only be kept when asked to."""
+        for record_batches, expected_batches in [(False, []), (True, [[build_evaluation("0")]])]:
+            with self.subTest(record_batches=record_batches):
+                config_client = CODE.FakeConfigClient(record_batches=record_batches)
+                config_client.put_evaluations(ResultToken="token", Evaluations=[build_evaluation("0")])
+                self.assertEqual(config_client.put_evaluations_batches, expected_batches)
+
+    def test_get_compliance_details_by_config_rule(self):
+        """The results should be paginated and filtered by compliance type."""
+        config_client = CODE.FakeConfigClient()
+        for i in range(250):
+            config_client.add_evaluation_result(
+                "some-rule", "AWS::EC2::Instance", str(i), "COMPLIANT", "some-annotation"
+            )
+        config_client.add_evaluation_result("some-rule", "AWS::EC2::Instance", "x", "INSUFFICIENT_DATA")
+
+        pages = []
+        next_token = ""
+        while True:
+            response = config_client.get_compliance_details_by_config_rule(
+                ConfigRuleName="some-rule", ComplianceTypes=["COMPLIANT"], Limit=100, NextToken=next_token
+            )
+            pages.append(response["EvaluationResults"])
+            next_token = response.get("NextToken")
+            if not next_token:
+                break
+        self.assertEqual([len(page) for page in pages], [100, 100, 50])
+        self.assertEqual(pages[0][0]["Annotation"], "some-annotation")
+
+    def test_get_resource_config_history(self):
+        config_client = CODE.FakeConfigClient()
+        with self.assertRaises(botocore.exceptions.ClientError) as context:
+            config_client.get_resource_config_history(resourceType="AWS::EC2::Instance", resourceId="i-1", limit=1)
+        self.assertEqual(context.exception.response["Error"]["Code"], "ResourceNotDiscoveredException")
+
+        item = CODE.build_resource_config_history_item("AWS::EC2::Instance", "i-1", {"instanceType": "t2.micro"})
+        config_client.add_configuration_item(item)
+        response = config_client.get_resource_config_history(resourceType="AWS::EC2::Instance", resourceId="i-1")
+        self.assertEqual(response["configurationItems"], [item])
+
+    @patch.object(CODE.time, "sleep")
+    def test_injected_faults(self, sleep_mock):
+        """Latency, throttles and failed evaluations should be injected as configured."""
+        config_client = CODE.FakeConfigClient(latency_seconds=0.5, throttle_rate=1.0)
+        with self.assertRaises(botocore.exceptions.ClientError) as context:
+            config_client.put_evaluations(ResultToken="token", Evaluations=[build_evaluation("a")])
+        self.assertEqual(context.exception.response["Error"]["Code"], "ThrottlingException")
+        self.assertEqual(config_client.throttled_calls["PutEvaluations"], 1)
+        sleep_mock.assert_called_once_with(0.5)
+
+        config_client = CODE.FakeConfigClient(failure_rate=0.5, seed=1)
+        evaluations = [build_evaluation(str(i)) for i in range(100)]
+        failed = config_client.put_evaluations(ResultToken="token", Evaluations=evaluations)["FailedEvaluations"]
+        self.assertTrue(0 < len(failed) < 100)
+        self.assertEqual(len(failed) + len(config_client.get_evaluation_results("myrule")), 100)
+
+    @patch.object(rdklib.util.evaluations, "process_evaluations", process_evaluations)
+    def test_use_fake_config_periodic(self):
+        """Evaluator.handle should report to the fake, and clean up the results of the previous run."""
+        config_client = CODE.FakeConfigClient(record_batches=True)
+        rule = PeriodicRule()
+        with CODE.use_fake_config(config_client) as fake:
+            self.assertIs(fake, config_client)
+            rule.resource_ids = [str(i) for i in range(250)]
+            Evaluator(rule).handle(create_test_scheduled_event(), {})
+            self.assertEqual(len(config_client.get_evaluation_results("myrule")), 250)
+            self.assertTrue(all(len(batch) <= 100 for batch in config_client.put_evaluations_batches))
+
+            rule.resource_ids = [str(i) for i in range(100)]
+            Evaluator(rule).handle(create_test_scheduled_event(), {})
+        self.assertEqual(
+            sorted(
+                result["EvaluationResultIdentifier"]["EvaluationResultQualifier"]["ResourceId"]
+                for result in config_client.get_evaluation_results("myrule")
+            ),
+            sorted(rule.resource_ids),
+        )
+        self.assertEqual(config_client.calls["GetComplianceDetailsByConfigRule"], 1 + 3)
+
+    @patch.object(rdklib.util.evaluations, "process_evaluations", process_evaluations)
+    @patch.object(rdklib.util.apistats, "API_CALL_STATS_ENABLED", True)
+    def test_use_fake_config_api_call_stats(self):
+        """The fakes should accept the botocore hooks registered when collecting API call stats."""
+        config_client = CODE.FakeConfigClient()
+        rule = PeriodicRule()
+        rule.resource_ids = ["i-1"]
+        with CODE.use_fake_config(config_client):
+            Evaluator(rule).handle(create_test_scheduled_event(), {})
+        self.assertEqual(len(config_client.get_evaluation_results("myrule")), 1)
+        self.assertIsNone(rdklib.util.apistats.get_current_stats())
+
+    @patch.object(rdklib.util.evaluations, "process_evaluations", process_evaluations)
+    def test_use_fake_config_oversized(self):
+        """Oversized notifications should be inflated from the configuration items of the fake."""
+        config_client = CODE.FakeConfigClient()
+        config_client.add_configuration_item(
+            CODE.build_resource_config_history_item("AWS::EC2::Instance", "i-1", {"instanceType": "m5.large"})
+        )
+        event = create_test_configurationchange_event(
+            {
+                "messageType": "OversizedConfigurationItemChangeNotification",
+                "notificationCreationTime": "2017-12-23T22:11:18.158Z",
+                "recordVersion": "1.0",
+                "configurationItemSummary": {"resourceType": "AWS::EC2::Instance", "resourceId": "i-1"},
+            }
+        )
+        with CODE.use_fake_config(config_client):
+            Evaluator(ChangeRule(), ["AWS::EC2::Instance"]).handle(event, {})
+        self.assertEqual(config_client.calls["GetResourceConfigHistory"], 1)
+        self.assertEqual(config_client.get_evaluation_results("myrule")[0]["ComplianceType"], "NON_COMPLIANT")